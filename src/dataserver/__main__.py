@@ -1,15 +1,82 @@
 """
 The main module for the dataserver/ package. Serves as an entering point for
 the visualization, routing, storing, and retrieving market data.
+
+Subcommands:
+    serve: run the message queue loop for trade/ (default).
+    record: download historical bars into a CSV directory.
+    aggregate: build higher timeframe bars from the recorded ones.
+
+zmq and yfinance are imported only by the subcommand that needs them.
 """
+import argparse
 import sys
 
-from dataserver import driver
 from utilities import logger
 
 log = logger.get_logger_config(__name__)
 
-def main() -> int:
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Runs the serve subcommand."""
+    from dataserver import driver
+
+    driver.run(port=args.port, workers=args.workers, csv_dir=args.csv_dir,
+               timeframes=args.timeframes)
+    return 0
+
+def cmd_record(args: argparse.Namespace) -> int:
+    """Runs the record subcommand."""
+    from dataserver import recorder
+
+    recorder.record(args.symbols, args.start, args.end, args.csv_dir,
+                    interval=args.interval, timeframes=args.timeframes)
+    return 0
+
+def cmd_aggregate(args: argparse.Namespace) -> int:
+    """Runs the aggregate subcommand."""
+    from dataserver import aggregator
+
+    aggregator.aggregate_csv(args.csv_dir, args.symbols, args.timeframes)
+    return 0
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser with all of the subcommands.
+    Returns:
+        argparse.ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser(prog="python -m dataserver")
+    parser.set_defaults(func=cmd_serve, port=5555, workers=4, csv_dir=None,
+                        timeframes=None)
+    subparsers = parser.add_subparsers(title="subcommands")
+
+    serve = subparsers.add_parser("serve", help="serve market data")
+    serve.add_argument("--port", type=int, default=5555)
+    serve.add_argument("--workers", type=int, default=4)
+    serve.add_argument("--csv-dir", help="directory with SYMBOL.csv files")
+    serve.add_argument("--timeframes", nargs="+",
+                       help="aggregate pushed bars, e.g. 5m 1h 1d")
+    serve.set_defaults(func=cmd_serve)
+
+    record = subparsers.add_parser("record", help="record historical bars")
+    record.add_argument("--symbols", nargs="+", required=True)
+    record.add_argument("--start", required=True)
+    record.add_argument("--end", required=True)
+    record.add_argument("--csv-dir", required=True)
+    record.add_argument("--interval", default="1d")
+    record.add_argument("--timeframes", nargs="+",
+                        help="also store aggregated bars, e.g. 5m 1h 1d")
+    record.set_defaults(func=cmd_record)
+
+    aggregate = subparsers.add_parser("aggregate",
+                                      help="aggregate recorded bars")
+    aggregate.add_argument("--symbols", nargs="+", required=True)
+    aggregate.add_argument("--csv-dir", required=True)
+    aggregate.add_argument("--timeframes", nargs="+", required=True)
+    aggregate.set_defaults(func=cmd_aggregate)
+    return parser
+
+def main(argv: list=None) -> int:
     """
     Main function that constitutes the main data loop that is responsible for
     message queue exchange with trade/, visualization, analytics, storage and
@@ -19,8 +86,8 @@ def main() -> int:
     Example:
         0.
     """
-    driver.run()
-    return 0
+    args = get_parser().parse_args(argv)
+    return args.func(args)
 
 if __name__ == '__main__':
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
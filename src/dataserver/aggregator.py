@@ -0,0 +1,172 @@
+"""
+Streaming bar aggregation for the dataserver package. Raw bars (usually one
+minute) are folded into several higher timeframes at once: every input bar
+updates the open bar of each timeframe in O(1), and a bar is handed to the
+sinks as soon as the first input bar of the next period arrives.
+
+Bars are tuples of (symbol, datetime, open, low, high, close, volume), as in
+trade.data, and a bar of a timeframe is labelled with the start of its period.
+Datetimes are naive exchange time (see dataserver.recorder); aware ones are
+rejected, since their periods would depend on the UTC offset.
+Aggregated bars are stored next to the raw SYMBOL.csv files, in a directory
+per timeframe: csv_dir/5m/SYMBOL.csv, csv_dir/1h/SYMBOL.csv and so on.
+"""
+from typing import Callable, Dict, List
+import datetime
+import os
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600,
+              "4h": 14400, "1d": 86400}
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+def get_period_start(timestamp: datetime.datetime,
+                     seconds: int) -> datetime.datetime:
+    """
+    Floors the timestamp to the start of its period.
+
+    Args:
+        timestamp: naive datetime of the bar (UTC or exchange time).
+        seconds: length of the period in seconds.
+
+    Returns:
+        Start of the period the timestamp belongs to.
+    """
+    if timestamp.tzinfo is not None:
+        raise ValueError("Bars must have naive datetimes, got %s"
+                         % timestamp.isoformat())
+    offset = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + datetime.timedelta(seconds=offset - offset % seconds)
+
+class BarAggregator:
+    """
+    Folds the raw bars of any number of symbols into the given timeframes.
+    Every completed bar is passed to each sink as sink(timeframe, bar).
+    """
+    def __init__(self, timeframes: List[str],
+                 sinks: List[Callable[[str, tuple], None]]) -> None:
+        """
+        Initializes the aggregator.
+
+        Args:
+            timeframes: names from TIMEFRAMES. Example: ["5m", "1h", "1d"].
+            sinks: callables receiving (timeframe, bar) for completed bars.
+        """
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAMES]
+        if unknown:
+            raise ValueError("Unsupported timeframes: %s" % ", ".join(unknown))
+        self.timeframes = [(tf, TIMEFRAMES[tf]) for tf in timeframes]
+        self.sinks = sinks
+        # Open bar per (timeframe, symbol), as a mutable list.
+        self.partial: Dict[tuple, list] = {}
+
+    def update(self, bar: tuple) -> None:
+        """
+        Folds a raw bar into every timeframe, emitting the bars it closes.
+
+        Args:
+            bar: (symbol, datetime, open, low, high, close, volume) tuple.
+        """
+        symbol, timestamp, open_, low, high, close, volume = bar
+        for timeframe, seconds in self.timeframes:
+            start = get_period_start(timestamp, seconds)
+            key = (timeframe, symbol)
+            current = self.partial.get(key)
+            if current is not None and current[1] == start:
+                current[3] = min(current[3], low)
+                current[4] = max(current[4], high)
+                current[5] = close
+                current[6] += volume
+                continue
+            if current is not None:
+                self.emit(timeframe, current)
+            self.partial[key] = [symbol, start, open_, low, high, close,
+                                 volume]
+
+    def flush(self) -> None:
+        """
+        Emits the open bars of every timeframe, e.g. at the end of a file.
+        """
+        for (timeframe, _), current in self.partial.items():
+            self.emit(timeframe, current)
+        self.partial = {}
+
+    def emit(self, timeframe: str, current: list) -> None:
+        """Hands a completed bar to every sink."""
+        bar = tuple(current)
+        for sink in self.sinks:
+            sink(timeframe, bar)
+
+class CSVBarWriter:
+    """
+    Sink that appends bars to csv_dir/TIMEFRAME/SYMBOL.csv, in the format
+    read by trade.data.HistoricCSVDataHandler. Raw bars can go through the
+    same writer with timeframe None, they land in csv_dir/SYMBOL.csv.
+    """
+    def __init__(self, csv_dir: str, append: bool=True) -> None:
+        """
+        Initializes the writer.
+
+        Args:
+            csv_dir: directory of the raw SYMBOL.csv files.
+            append: append to existing files, otherwise they are rewritten.
+        """
+        self.csv_dir = csv_dir
+        self.append = append
+        self.files = {}
+
+    def get_path(self, timeframe: str, symbol: str) -> str:
+        """Returns the CSV path of the symbol in the timeframe."""
+        if timeframe is None:
+            return os.path.join(self.csv_dir, "%s.csv" % symbol)
+        return os.path.join(self.csv_dir, timeframe, "%s.csv" % symbol)
+
+    def __call__(self, timeframe: str, bar: tuple) -> None:
+        """
+        Writes a bar to its file, opening the file on the first bar.
+        """
+        key = (timeframe, bar[0])
+        out = self.files.get(key)
+        if out is None:
+            path = self.get_path(timeframe, bar[0])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            exists = self.append and os.path.exists(path)
+            out = self.files[key] = open(path, "a" if self.append else "w")
+            if not exists:
+                out.write("datetime,open,low,high,close,volume,oi\n")
+        out.write("%s,%r,%r,%r,%r,%r,0\n" % (bar[1].isoformat(" "),
+                                            *bar[2:]))
+
+    def flush(self) -> None:
+        """Flushes every open file."""
+        for out in self.files.values():
+            out.flush()
+
+    def close(self) -> None:
+        """Closes every open file."""
+        for out in self.files.values():
+            out.close()
+        self.files = {}
+
+def aggregate_csv(csv_dir: str, symbol_list: list,
+                  timeframes: List[str]) -> None:
+    """
+    Rebuilds the timeframe files of the symbols from their raw CSVs,
+    streaming every raw bar through a BarAggregator once.
+
+    Args:
+        csv_dir: directory of the raw SYMBOL.csv files.
+        symbol_list: list of symbol strings.
+        timeframes: names from TIMEFRAMES.
+    """
+    from trade.data import load_bar_store
+
+    writer = CSVBarWriter(csv_dir, append=False)
+    try:
+        for symbol in symbol_list:
+            aggregator = BarAggregator(timeframes, [writer])
+            for bar in load_bar_store(csv_dir, [symbol])[symbol]:
+                aggregator.update(bar)
+            aggregator.flush()
+    finally:
+        writer.close()
@@ -2,33 +2,300 @@
 Driver file for the dataserver package/module. An infinite loop is used for
 event-driven data handling and analysis. Uses zmq library for the message queue
 over TCP.
+
+Engines connect to a ROUTER socket, which zmq.proxy forwards to a DEALER
+socket over inproc, where a pool of worker threads (REP sockets) picks the
+requests up. Many engines, and many requests from the same engine, are
+served at once. Requests and replies are JSON objects; the "id" field of a
+request is copied into its reply, so that a DEALER client can keep several
+requests in flight and match the replies as they come back:
+
+    {"id": 7, "method": "bars", "symbol": "SPY", "start": 0, "stop": 100}
+    {"id": 7, "result": [["2020-01-02T00:00:00", open, low, high, close,
+                          volume], ...]}
+
+"bars" requests take an optional "timeframe" (see dataserver.aggregator).
+Live bars are sent with "push" requests, with naive exchange-time datetimes
+(no UTC offset); they are stored, folded into the
+served timeframes, and every completed bar is published on a PUB socket
+with the topic "TIMEFRAME.SYMBOL":
+
+    {"id": 8, "method": "push",
+     "bar": ["SPY", "2020-01-02T09:31:00", open, low, high, close, volume]}
+
+Charts ask for level-of-detail views (see dataserver.lod) of the close
+prices of a symbol, or of any series pushed with "push_series", such as
+the equity_curve column of a backtest. A view has at most about 2 * width
+points whatever the time range:
+
+    {"id": 9, "method": "view", "series": "SPY", "width": 800,
+     "start": "2020-01-01T00:00:00", "stop": "2021-01-01T00:00:00"}
+    {"id": 10, "method": "push_series", "series": "momentum.equity_curve",
+     "points": [["2020-01-02T00:00:00", 1.0], ...], "replace": true}
+
+"replace" drops the points pushed before under the same name, e.g. when a
+backtest is run again.
+
+REQ clients work too, DEALER clients have to send the empty delimiter frame
+in front of the request themselves.
 """
-import time
-import zmq
+from typing import Dict, List, Optional
+import datetime
+import json
+import threading
 
+from dataserver.aggregator import BarAggregator, CSVBarWriter
+from dataserver.lod import LODStore, to_datetime, to_seconds
 from utilities import logger
 
 log = logger.get_logger_config(__name__)
 
-def run() -> None:
+BACKEND = "inproc://workers"
+
+class BarStore:
+    """
+    Bars loaded from the CSV directory, shared by all of the workers. Every
+    symbol (and timeframe) is loaded on its first request and kept in
+    memory afterwards, pushed bars are appended to the loaded ones. The
+    Feed pushes under the same lock the bars are loaded with, so a bar is
+    either in the file when it is loaded or appended afterwards.
+    """
+    def __init__(self, csv_dir: Optional[str]) -> None:
+        """
+        Initializes the empty store.
+
+        Args:
+            csv_dir: directory with SYMBOL.csv files, None to serve no bars.
+        """
+        self.csv_dir = csv_dir
+        self.bars: Dict[tuple, list] = {}
+        # Reentrant: Feed.view() loads bars while holding it.
+        self.lock = threading.RLock()
+
+    def get(self, symbol: str, timeframe: str=None) -> list:
+        """
+        Returns all of the bars of the symbol, loading them if needed.
+
+        Args:
+            symbol: ticker symbol. Example: SPY.
+            timeframe: aggregated timeframe, None for the raw bars.
+
+        Returns:
+            List of (symbol, datetime, open, low, high, close, volume).
+        """
+        key = (timeframe, symbol)
+        bars = self.bars.get(key)
+        if bars is None:
+            if self.csv_dir is None:
+                raise KeyError("no csv directory is served")
+            with self.lock:
+                bars = self.bars.get(key)
+                if bars is None:
+                    from trade.data import load_bar_store
+
+                    bars = load_bar_store(self.csv_dir, [symbol],
+                                          timeframe)[symbol]
+                    self.bars[key] = bars
+        return bars
+
+    def append(self, timeframe: str, bar: tuple) -> None:
+        """
+        Appends a new bar if its symbol and timeframe are loaded already,
+        otherwise it will be read from the CSV with the rest. Called by
+        the Feed with self.lock held.
+        """
+        bars = self.bars.get((timeframe, bar[0]))
+        if bars is not None:
+            bars.append(bar)
+
+class Feed:
+    """
+    Live bar feed shared by the workers. Pushed bars are written to the raw
+    CSVs and folded into the timeframes; completed bars are written to the
+    timeframe CSVs, appended to the store, and published. The close of every
+    pushed bar also extends the level-of-detail view of its symbol.
+    """
+    def __init__(self, store: BarStore, timeframes: List[str],
+                 publisher: object=None) -> None:
+        """
+        Initializes the feed.
+
+        Args:
+            store: bar store shared by the workers.
+            timeframes: names from aggregator.TIMEFRAMES.
+            publisher: zmq PUB socket, None to not publish.
+        """
+        self.store = store
+        self.publisher = publisher
+        self.writer = CSVBarWriter(store.csv_dir) \
+            if store.csv_dir is not None else None
+        sinks = [store.append, self.publish]
+        if self.writer is not None:
+            sinks.append(self.writer)
+        self.aggregator = BarAggregator(timeframes, sinks)
+        self.views = LODStore()
+        self.lock = store.lock
+
+    def push(self, bar: tuple) -> None:
+        """
+        Handles a raw bar. Bars are processed one at a time, in order, and
+        under the lock of the store so that no symbol is loaded halfway.
+
+        Args:
+            bar: (symbol, datetime, open, low, high, close, volume) tuple,
+                 with a naive datetime.
+        """
+        if bar[1].tzinfo is not None:
+            raise ValueError("Bars must have naive datetimes, got %s"
+                             % bar[1].isoformat())
+        with self.lock:
+            if self.writer is not None:
+                self.writer(None, bar)
+            self.store.append(None, bar)
+            self.aggregator.update(bar)
+            if self.views.has(bar[0]):
+                self.views.extend(bar[0], [(to_seconds(bar[1]), bar[5])])
+            if self.writer is not None:
+                self.writer.flush()
+
+    def view(self, name: str, start: str=None, stop: str=None,
+             width: int=1000) -> list:
+        """
+        Returns a level-of-detail view of a series. The view of a symbol
+        is built from its stored bars on the first request.
+
+        Args:
+            name: series name, or a symbol for its close prices.
+            start: ISO datetime of the start of the range, None for all.
+            stop: ISO datetime of the end of the range, None for all.
+            width: number of pixels of the chart.
+
+        Returns:
+            List of [ISO datetime, value] points.
+        """
+        if not self.views.has(name):
+            with self.lock:
+                if not self.views.has(name):
+                    self.views.extend(name, [(to_seconds(bar[1]), bar[5])
+                                             for bar in self.store.get(name)])
+        points = self.views.query(
+            name,
+            None if start is None else to_seconds(
+                datetime.datetime.fromisoformat(start)),
+            None if stop is None else to_seconds(
+                datetime.datetime.fromisoformat(stop)),
+            width)
+        return [[to_datetime(time).isoformat(), value]
+                for time, value in points]
+
+    def publish(self, timeframe: str, bar: tuple) -> None:
+        """Publishes a completed bar, called with self.lock held."""
+        if self.publisher is not None:
+            self.publisher.send_multipart([
+                ("%s.%s" % (timeframe, bar[0])).encode(),
+                json.dumps([bar[0], bar[1].isoformat()] +
+                           list(bar[2:])).encode()])
+
+def handle_request(message: bytes, store: BarStore,
+                   feed: Feed=None) -> bytes:
+    """
+    Handles a single request and returns the encoded reply. Errors are
+    returned to the client in the "error" field instead of being raised.
+
+    Args:
+        message: JSON encoded request.
+        store: bar store of the worker.
+        feed: live bar feed, None if pushing is not supported.
+
+    Returns:
+        JSON encoded reply.
+    """
+    request_id = None
+    try:
+        request = json.loads(message)
+        request_id = request.get("id")
+        method = request.get("method")
+        if method == "ping":
+            result = "pong"
+        elif method == "bars":
+            bars = store.get(request["symbol"], request.get("timeframe"))
+            result = [[bar[1].isoformat()] + list(bar[2:])
+                      for bar in bars[request.get("start", 0):
+                                      request.get("stop")]]
+        elif method == "push" and feed is not None:
+            symbol, timestamp, *values = request["bar"]
+            feed.push((symbol, datetime.datetime.fromisoformat(timestamp))
+                      + tuple(float(value) for value in values))
+            result = "ok"
+        elif method == "view" and feed is not None:
+            result = feed.view(request["series"], request.get("start"),
+                               request.get("stop"),
+                               int(request.get("width", 1000)))
+        elif method == "push_series" and feed is not None:
+            feed.views.extend(request["series"], [
+                (to_seconds(datetime.datetime.fromisoformat(timestamp)),
+                 float(value)) for timestamp, value in request["points"]],
+                bool(request.get("replace", False)))
+            result = "ok"
+        else:
+            raise ValueError("unknown method %r" % method)
+        reply = {"id": request_id, "result": result}
+    except Exception as error:  # pylint: disable=broad-except
+        log.debug("Request %r failed: %s", message, error)
+        reply = {"id": request_id, "error": str(error)}
+    return json.dumps(reply).encode()
+
+def worker(ctx: object, store: BarStore, feed: Feed=None) -> None:
+    """
+    Body of a worker thread: answers requests from the backend forever.
+
+    Args:
+        ctx: zmq.Context shared with the frontend (required by inproc).
+        store: bar store shared by the workers.
+        feed: live bar feed shared by the workers.
+    """
+    import zmq
+
+    socket = ctx.socket(zmq.REP)
+    socket.connect(BACKEND)
+    while True:
+        message = socket.recv()
+        socket.send(handle_request(message, store, feed))
+
+def run(port: int=5555, workers: int=4, csv_dir: str=None,
+        timeframes: List[str]=None, pub_port: int=None) -> None:
     """
     Main run function that contains the event-driven infinite loop used to
     serve and analyze the market data using different Python APIs, such as
     yfinance. Uses zmq over TCP to communicate with the trade engine.
+
+    Args:
+        port: TCP port of the frontend.
+        workers: number of worker threads.
+        csv_dir: directory with SYMBOL.csv files served by "bars" requests.
+        timeframes: timeframes pushed bars are aggregated into.
+                    Example: ["5m", "1h", "1d"].
+        pub_port: TCP port of the completed bars publisher, port + 1 by
+                  default.
     """
+    import zmq
+
     # Set up zmq variables.
-    ctx = zmq.Context()
-    socket = ctx.socket(zmq.REP)
-    socket.bind("tcp://*:5555")
+    ctx = zmq.Context.instance()
+    frontend = ctx.socket(zmq.ROUTER)
+    frontend.bind("tcp://*:%d" % port)
+    backend = ctx.socket(zmq.DEALER)
+    backend.bind(BACKEND)
 
-    # Event-driven infinite loop.
-    while True:
-        # Wait for next request from engine.
-        message = socket.recv()
-        log.info("Received request: %s" % message)
+    publisher = ctx.socket(zmq.PUB)
+    publisher.bind("tcp://*:%d" % (pub_port or port + 1))
 
-        # Tick for the next request.
-        time.sleep(1)
+    store = BarStore(csv_dir)
+    feed = Feed(store, timeframes or [], publisher)
+    for i in range(workers):
+        threading.Thread(target=worker, args=(ctx, store, feed),
+                         name="dataserver-worker-%d" % i, daemon=True).start()
+    log.info("Serving on port %d with %d workers", port, workers)
 
-        # Send reply to engine.
-        socket.send(b"{driver data}.")
\ No newline at end of file
+    # Event-driven infinite loop, shuffles messages between the sockets.
+    zmq.proxy(frontend, backend)
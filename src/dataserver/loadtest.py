@@ -0,0 +1,95 @@
+"""
+Load test for the dataserver. Starts N client processes, each with a DEALER
+socket that keeps `depth` requests in flight, and reports the p50/p99
+latency and the throughput over all of them.
+
+Usage, from the src/ directory, with the server running:
+    python -m dataserver.loadtest --clients 8 --requests 2000 --depth 4
+"""
+from typing import List
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+def client(endpoint: str, n_requests: int, depth: int,
+           request: dict) -> List[float]:
+    """
+    Sends n_requests requests, depth at a time, and measures each of them.
+
+    Args:
+        endpoint: server address. Example: tcp://localhost:5555.
+        n_requests: number of requests to send.
+        depth: number of requests in flight.
+        request: request object, the id field is filled in.
+
+    Returns:
+        List of latencies in seconds.
+    """
+    import zmq
+
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.DEALER)
+    socket.connect(endpoint)
+
+    sent = {}
+    latencies = []
+    next_id = 0
+    while len(latencies) < n_requests:
+        while next_id < n_requests and len(sent) < depth:
+            request["id"] = next_id
+            sent[next_id] = time.perf_counter()
+            socket.send_multipart([b"", json.dumps(request).encode()])
+            next_id += 1
+        _, reply = socket.recv_multipart()
+        reply_id = json.loads(reply)["id"]
+        latencies.append(time.perf_counter() - sent.pop(reply_id))
+
+    socket.close()
+    ctx.term()
+    return latencies
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Returns the value below which the given fraction of values lie."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def main(argv: list=None) -> int:
+    """
+    Runs the load test and prints the results.
+    Returns:
+        An integer that signifies error code.
+    """
+    parser = argparse.ArgumentParser(prog="python -m dataserver.loadtest")
+    parser.add_argument("--endpoint", default="tcp://localhost:5555")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="requests per client")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="requests in flight per client")
+    parser.add_argument("--method", default="ping")
+    parser.add_argument("--symbol")
+    parser.add_argument("--stop", type=int)
+    args = parser.parse_args(argv)
+
+    request = {"method": args.method}
+    if args.symbol is not None:
+        request.update(symbol=args.symbol, stop=args.stop)
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.clients) as pool:
+        results = pool.starmap(client, [(args.endpoint, args.requests,
+                                         args.depth, request)] * args.clients)
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result]
+    print("clients: %d, requests: %d, depth: %d" % (args.clients,
+                                                   len(latencies), args.depth))
+    print("p50: %.3f ms" % (percentile(latencies, 0.50) * 1000))
+    print("p99: %.3f ms" % (percentile(latencies, 0.99) * 1000))
+    print("throughput: %.0f req/s" % (len(latencies) / elapsed))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
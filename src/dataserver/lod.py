@@ -0,0 +1,221 @@
+"""
+Level-of-detail views of time series for visualization. Every series (close
+prices of a symbol, equity_curve column of a backtest, ...) is kept as a
+min/max pyramid: level 0 holds the raw points, and every bucket of level k
+holds the minimum and the maximum (with their times) of factor**k raw
+points. Appending a point updates the open bucket of each level, so the
+pyramid is maintained incrementally as new bars arrive.
+
+A query for a time range and a pixel width picks the finest level with at
+most `width` buckets in the range and returns the min and max point of each
+bucket, so any zoom level costs at most about 2 * width points while still
+showing every spike. The buckets at the edges of the range are clipped to
+it, their extremes are put together from the finer levels.
+"""
+from typing import Dict, List, Tuple
+import bisect
+import datetime
+import threading
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+def to_seconds(timestamp: datetime.datetime) -> float:
+    """Converts a naive datetime into seconds since the epoch."""
+    return (timestamp - EPOCH).total_seconds()
+
+def to_datetime(seconds: float) -> datetime.datetime:
+    """Converts seconds since the epoch back into a naive datetime."""
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+class MinMaxPyramid:
+    """
+    Min/max pyramid of a single series. Points must be appended in time
+    order; times are floats (seconds since the epoch).
+    """
+    def __init__(self, factor: int=4, levels: int=12) -> None:
+        """
+        Initializes the empty pyramid.
+
+        Args:
+            factor: number of buckets of level k - 1 in a bucket of level k.
+            levels: number of levels above the raw points. With the
+                    defaults the top buckets hold 4**12 (16M) points.
+        """
+        self.factor = factor
+        self.times: List[float] = []
+        self.values: List[float] = []
+        # Per level: bucket size and parallel lists of the bucket
+        # min time, min value, max time, max value.
+        self.levels = [(factor ** k, [], [], [], [])
+                       for k in range(1, levels + 1)]
+
+    def append(self, time: float, value: float) -> None:
+        """
+        Appends a point and folds it into the open bucket of every level.
+
+        Args:
+            time: seconds since the epoch, not before the last point.
+            value: value of the series.
+        """
+        if self.times and time < self.times[-1]:
+            raise ValueError("Points must be appended in time order")
+        index = len(self.times)
+        self.times.append(time)
+        self.values.append(value)
+        for size, min_t, min_v, max_t, max_v in self.levels:
+            if index % size == 0:
+                min_t.append(time)
+                min_v.append(value)
+                max_t.append(time)
+                max_v.append(value)
+                continue
+            if value < min_v[-1]:
+                min_t[-1] = time
+                min_v[-1] = value
+            if value > max_v[-1]:
+                max_t[-1] = time
+                max_v[-1] = value
+
+    def query(self, start: float=None, stop: float=None,
+              width: int=1000) -> List[Tuple[float, float]]:
+        """
+        Returns a decimated view of the [start, stop] time range.
+
+        Args:
+            start: first time of the range, None for the first point.
+            stop: last time of the range, None for the last point.
+            width: number of pixels (buckets) of the view.
+
+        Returns:
+            List of (time, value) points in time order, at most about
+            2 * width of them.
+        """
+        first = 0 if start is None else bisect.bisect_left(self.times, start)
+        last = len(self.times) if stop is None \
+            else bisect.bisect_right(self.times, stop)
+        if last - first <= width:
+            return list(zip(self.times[first:last], self.values[first:last]))
+
+        # Finest level that fits, the top one if none does.
+        level = self.levels[-1]
+        for candidate in self.levels:
+            size = candidate[0]
+            if (last - 1) // size - first // size + 1 <= width:
+                level = candidate
+                break
+        size, min_t, min_v, max_t, max_v = level
+
+        points = []
+        for bucket in range(first // size, (last - 1) // size + 1):
+            lo = bucket * size
+            hi = lo + size
+            if lo < first or hi > last:
+                low_t, low_v, high_t, high_v = self.get_extremes(
+                    max(lo, first), min(hi, last))
+                low, high = (low_t, low_v), (high_t, high_v)
+            else:
+                low = (min_t[bucket], min_v[bucket])
+                high = (max_t[bucket], max_v[bucket])
+            if low[0] > high[0]:
+                low, high = high, low
+            points.append(low)
+            if high != low:
+                points.append(high)
+        return points
+
+    def get_extremes(self, lo: int, hi: int) -> Tuple[float, float,
+                                                       float, float]:
+        """
+        Returns the min and max points of the raw points [lo, hi), covering
+        the range with the largest aligned buckets that fit, so it costs
+        O(factor * levels) instead of O(hi - lo).
+
+        Args:
+            lo: index of the first point.
+            hi: index after the last point, greater than lo.
+
+        Returns:
+            (min time, min value, max time, max value) tuple.
+        """
+        low_t = high_t = self.times[lo]
+        low_v = high_v = self.values[lo]
+        pos = lo
+        while pos < hi:
+            # Raw point unless an aligned bucket fits in the rest.
+            found = (1, self.times[pos], self.values[pos], self.times[pos],
+                     self.values[pos])
+            for size, min_t, min_v, max_t, max_v in self.levels:
+                if pos % size or pos + size > hi:
+                    break
+                bucket = pos // size
+                found = (size, min_t[bucket], min_v[bucket], max_t[bucket],
+                         max_v[bucket])
+            size, t_min, v_min, t_max, v_max = found
+            if v_min < low_v:
+                low_t, low_v = t_min, v_min
+            if v_max > high_v:
+                high_t, high_v = t_max, v_max
+            pos += size
+        return low_t, low_v, high_t, high_v
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+class LODStore:
+    """
+    Named pyramids shared by the dataserver workers.
+    """
+    def __init__(self, factor: int=4, levels: int=12) -> None:
+        """
+        Initializes the empty store.
+
+        Args:
+            factor: see MinMaxPyramid.
+            levels: see MinMaxPyramid.
+        """
+        self.factor = factor
+        self.levels = levels
+        self.series: Dict[str, MinMaxPyramid] = {}
+        self.lock = threading.Lock()
+
+    def has(self, name: str) -> bool:
+        """Returns True if the series exists."""
+        return name in self.series
+
+    def extend(self, name: str, points: List[Tuple[float, float]],
+               replace: bool=False) -> None:
+        """
+        Appends points to a series, creating it on the first call. The
+        whole batch is checked first, so a batch out of time order raises
+        ValueError without changing the series.
+
+        Args:
+            name: series name. Example: "SPY" or "momentum.equity_curve".
+            points: (time, value) pairs in time order.
+            replace: drop the existing points of the series first.
+        """
+        with self.lock:
+            pyramid = None if replace else self.series.get(name)
+            last = pyramid.times[-1] if pyramid is not None and \
+                len(pyramid) else None
+            for time, _ in points:
+                if last is not None and time < last:
+                    raise ValueError("Points of %s must be appended in "
+                                     "time order" % name)
+                last = time
+            if pyramid is None:
+                pyramid = self.series[name] = MinMaxPyramid(self.factor,
+                                                            self.levels)
+            for time, value in points:
+                pyramid.append(time, value)
+
+    def query(self, name: str, start: float=None, stop: float=None,
+              width: int=1000) -> List[Tuple[float, float]]:
+        """
+        Returns a decimated view of a series, see MinMaxPyramid.query().
+        """
+        with self.lock:
+            pyramid = self.series.get(name)
+            if pyramid is None:
+                raise KeyError("unknown series %r" % name)
+            return pyramid.query(start, stop, width)
@@ -0,0 +1,66 @@
+"""
+Recorder for the dataserver package. Downloads historical bars with yfinance
+and stores them as SYMBOL.csv files in the column order expected by
+trade.data.HistoricCSVDataHandler (datetime, open, low, high, close, volume,
+oi), so that recorded data can be backtested right away. Timestamps are
+stored as naive exchange time, the way the CSV readers and the aggregator
+expect them.
+"""
+import os
+
+from utilities import logger
+
+log = logger.get_logger_config(__name__)
+
+def to_bar_frame(data: object) -> object:
+    """
+    Converts a yfinance history frame into the SYMBOL.csv layout.
+
+    yfinance indexes the bars with timezone-aware timestamps; written as is,
+    a file spanning a daylight saving change holds two UTC offsets and is
+    read back as strings. The index is turned into naive exchange time.
+
+    Args:
+        data: pandas DataFrame returned by yfinance.Ticker.history().
+
+    Returns:
+        DataFrame with the open, low, high, close, volume and oi columns
+        indexed by naive datetime.
+    """
+    data = data[["Open", "Low", "High", "Close", "Volume"]].copy()
+    data.columns = ["open", "low", "high", "close", "volume"]
+    data["oi"] = 0
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    data.index.name = "datetime"
+    return data
+
+def record(symbol_list: list, start: str, end: str, csv_dir: str,
+           interval: str="1d", timeframes: list=None) -> None:
+    """
+    Downloads the bars for every symbol and writes them to csv_dir.
+
+    Args:
+        symbol_list: list of symbol strings. Example: ["IGE", "SPY"].
+        start: YYYY-MM-DD string that specified the start date of the data.
+        end: YYYY-MM-DD string that specifies the end date of the data.
+        csv_dir: directory to write the SYMBOL.csv files into.
+        interval: yfinance bar interval. Example: 1m, 1h, 1d.
+        timeframes: higher timeframes to aggregate the recorded bars into.
+                    Example: ["5m", "1h"].
+    """
+    import yfinance as yf
+
+    os.makedirs(csv_dir, exist_ok=True)
+    for symbol in symbol_list:
+        data = yf.Ticker(symbol).history(start=start, end=end,
+                                         interval=interval, actions=False)
+        data = to_bar_frame(data)
+        path = os.path.join(csv_dir, "%s.csv" % symbol)
+        data.to_csv(path)
+        log.info("Recorded %d bars of %s to %s", len(data), symbol, path)
+
+    if timeframes:
+        from dataserver.aggregator import aggregate_csv
+
+        aggregate_csv(csv_dir, symbol_list, timeframes)
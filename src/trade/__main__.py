@@ -2,26 +2,196 @@
 The main module for the trade/ package that performs as a trading engine for the
 data coming from dataserver. trade.engine module contains the event-driven
 infinite loop that is responsible for all transactions.
+
+Subcommands:
+    backtest: run a single backtest over CSV data.
+    sweep: run one backtest per symbol group over a pool of processes.
+    replay: replay an event journal recorded by backtest --journal.
+    analyze: print summary statistics of a saved equity curve.
+
+Without a subcommand the engine connects to the dataserver, as before. Only
+argparse and the standard library are imported up front, everything else is
+imported by the subcommand that needs it.
 """
+import argparse
 import sys
 
-from trade import engine
 from utilities import logger
 
 log = logger.get_logger_config(__name__)
 
-def main() -> int:
+def print_stats(stats: list) -> None:
+    """Prints (name, value) summary statistics one per line."""
+    for name, value in stats:
+        print("%s: %s" % (name, value))
+
+def cmd_backtest(args: argparse.Namespace) -> int:
+    """Runs the backtest subcommand."""
+    from trade import engine
+
+    port = engine.backtest(args.csv_dir, args.symbols,
+                           initial_capital=args.capital,
+                           checkpoint=args.checkpoint,
+                           checkpoint_every=args.checkpoint_every,
+                           timeframe=args.timeframe,
+                           journal=args.journal)
+    print_stats(port.print_summary_stats())
+    if args.output is not None:
+        port.equity_curve.to_csv(args.output)
+    if args.view is not None:
+        try:
+            publish_equity_curve(args.view_endpoint, args.view,
+                                 port.equity_curve["equity_curve"],
+                                 timeout=args.view_timeout)
+        except RuntimeError as error:
+            log.error("Could not publish the equity curve: %s", error)
+            return 1
+    return 0
+
+def publish_equity_curve(endpoint: str, name: str, curve: object,
+                         chunk: int=10000, timeout: float=10.0) -> None:
+    """
+    Pushes an equity curve to the dataserver, which keeps level-of-detail
+    views of it for charts (see dataserver.lod). A curve pushed before
+    under the same name is replaced.
+
+    Args:
+        endpoint: dataserver address. Example: tcp://localhost:5555.
+        name: series name on the dataserver.
+        curve: pandas Series indexed on datetime.
+        chunk: number of points per request.
+        timeout: seconds to wait for every reply.
+
+    Raises:
+        RuntimeError: the dataserver returned an error or did not reply
+                      within the timeout (e.g. it is not running).
+    """
+    import json
+    import zmq
+
+    socket = zmq.Context.instance().socket(zmq.REQ)
+    # Give up on a missing server instead of blocking in recv() or close().
+    socket.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(endpoint)
+    points = [[index.isoformat(), float(value)]
+              for index, value in curve.dropna().items()]
+    try:
+        for i in range(0, len(points), chunk):
+            socket.send(json.dumps({"id": i, "method": "push_series",
+                                    "series": name,
+                                    "points": points[i:i + chunk],
+                                    "replace": i == 0}).encode())
+            try:
+                reply = json.loads(socket.recv())
+            except zmq.Again:
+                raise RuntimeError("no reply from the dataserver at %s "
+                                   "within %g s" % (endpoint, timeout))
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+    finally:
+        socket.close()
+
+def cmd_sweep(args: argparse.Namespace) -> int:
+    """Runs the sweep subcommand, one backtest per symbol."""
+    from trade import engine
+
+    results = engine.sweep(args.csv_dir, [[s] for s in args.symbols],
+                           initial_capital=args.capital,
+                           processes=args.processes)
+    for symbol_list, stats in results:
+        print(",".join(symbol_list))
+        print_stats(stats)
+    return 0
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    """Runs the analyze subcommand on an equity curve CSV."""
+    import pandas as pd
+    from trade.performance import get_summary_stats
+
+    curve = pd.read_csv(args.equity_csv, index_col=0, parse_dates=True)
+    print_stats(get_summary_stats(curve))
+    return 0
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    """Runs the replay subcommand and reports whether the run matches."""
+    from trade import journal
+
+    strategy_cls = None
+    if args.strategy is not None:
+        strategy_cls = journal.load_class(args.strategy)
+    result = journal.replay(args.journal, strategy_cls, speed=args.speed)
+    print("events: %d" % result["events"])
+    keys = ("events_match", "fills_match", "holdings_match")
+    for key in keys:
+        print("%s: %s" % (key, result[key]))
+    return 0 if all(result[key] for key in keys) else 1
+
+def cmd_connect(args: argparse.Namespace) -> int:
+    """Connects to the dataserver (default without a subcommand)."""
+    from trade import engine
+
+    engine.run()
+    return 0
+
+def get_parser() -> argparse.ArgumentParser:
     """
-    Main function that constitutes the main data loop that is responsible for
-    message queue exchange with trade/, visualization, analytics, storage and
-    retrieval of the information.
+    Builds the command line parser with all of the subcommands.
+    Returns:
+        argparse.ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser(prog="python -m trade")
+    parser.set_defaults(func=cmd_connect)
+    subparsers = parser.add_subparsers(title="subcommands")
+
+    backtest = subparsers.add_parser("backtest", help="run a backtest")
+    backtest.add_argument("--csv-dir", required=True)
+    backtest.add_argument("--symbols", nargs="+", required=True)
+    backtest.add_argument("--capital", type=float, default=100000.0)
+    backtest.add_argument("--output", help="save the equity curve CSV")
+    backtest.add_argument("--checkpoint", help="snapshot file to resume from")
+    backtest.add_argument("--checkpoint-every", type=int, default=1000)
+    backtest.add_argument("--timeframe", help="aggregated bars, e.g. 1h")
+    backtest.add_argument("--journal", help="record every event to a file")
+    backtest.add_argument("--view", help="publish the equity curve to the "
+                          "dataserver charts under this name")
+    backtest.add_argument("--view-endpoint", default="tcp://localhost:5555")
+    backtest.add_argument("--view-timeout", type=float, default=10.0,
+                          help="seconds to wait for the dataserver")
+    backtest.set_defaults(func=cmd_backtest)
+
+    sweep = subparsers.add_parser("sweep", help="backtest each symbol")
+    sweep.add_argument("--csv-dir", required=True)
+    sweep.add_argument("--symbols", nargs="+", required=True)
+    sweep.add_argument("--capital", type=float, default=100000.0)
+    sweep.add_argument("--processes", type=int)
+    sweep.set_defaults(func=cmd_sweep)
+
+    replay = subparsers.add_parser("replay", help="replay an event journal")
+    replay.add_argument("journal")
+    replay.add_argument("--speed", type=float,
+                        help="multiple of the recorded pace, default max")
+    replay.add_argument("--strategy", help="strategy class to replay with, "
+                        "e.g. trade.strategy.BuyAndHoldStrategy; default "
+                        "the recorded one")
+    replay.set_defaults(func=cmd_replay)
+
+    analyze = subparsers.add_parser("analyze", help="equity curve stats")
+    analyze.add_argument("equity_csv")
+    analyze.set_defaults(func=cmd_analyze)
+    return parser
+
+def main(argv: list=None) -> int:
+    """
+    Main function that parses the command line and dispatches to the
+    requested subcommand.
     Returns:
         An integer that signifies error code.
     Example:
         0.
     """
-    engine.run()
-    return 0
+    args = get_parser().parse_args(argv)
+    return args.func(args)
 
 if __name__ == '__main__':
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
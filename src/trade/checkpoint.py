@@ -0,0 +1,235 @@
+"""
+Checkpointing and resume for long backtests. A snapshot holds the position
+of the data feed, the strategy state, the portfolio ledgers and the events
+still pending on the queue, as returned by the get_state() methods of the
+components, along with the parameters of the run it belongs to.
+
+The snapshot is pickled on the event loop thread, between two bars, so that
+it is consistent; compression and the file write (the slow part) happen on a
+background thread. The portfolio ledgers grow by a row per bar and are never
+modified once written, so every snapshot only carries the rows added since
+the previous one: the time the loop is paused does not grow with the length
+of the run.
+
+File layout: MAGIC, then frames of a fixed header (payload length, crc32)
+followed by the compressed pickled snapshot. Frames are only appended and
+fsynced; a frame cut short by a crash fails its length or checksum and is
+ignored (and overwritten on resume), leaving the previous snapshots intact.
+"""
+from typing import Iterator, Optional, Tuple
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from utilities import logger
+
+log = logger.get_logger_config(__name__)
+
+MAGIC = b"TRCK\x02"
+HEADER = struct.Struct("<II")
+
+class Checkpointer:
+    """
+    Appends a snapshot of the backtest every `every` bars. If the writer
+    falls behind, pending snapshots are written together.
+    """
+    def __init__(self, path: str, every: int=1000, params: dict=None,
+                 state: dict=None) -> None:
+        """
+        Initializes the checkpointer and starts the writer thread.
+
+        Args:
+            path: snapshot file.
+            every: number of bars between two checkpoints.
+            params: parameters of the run (csv_dir, symbol_list, strategy,
+                    ...), checked by load() before resuming.
+            state: snapshot the run was resumed from, as returned by
+                   load(). The file is then appended to instead of being
+                   rewritten.
+        """
+        self.path = path
+        self.every = every
+        self.params = params or {}
+        self.last_saved = None
+        self.ledger_rows = 0
+
+        # Measurements: time spent on the loop thread and on the writer.
+        self.snapshots = 0
+        self.last_size = 0
+        self.total_bytes = 0
+        self.loop_seconds = 0.0
+        self.write_seconds = 0.0
+
+        if state is None:
+            self.out = open(path, "wb")
+            self.out.write(MAGIC)
+        else:
+            # Drop whatever follows the last complete frame.
+            self.out = open(path, "r+b")
+            self.out.truncate(state["offset"])
+            self.out.seek(state["offset"])
+            self.ledger_rows = len(state["portfolio"]["all_holdings"])
+
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop,
+                                       name="checkpoint-writer", daemon=True)
+        self.writer.start()
+
+    def maybe_save(self, n_bars: int, bars: object, strategy: object,
+                   port: object, events: queue.Queue) -> None:
+        """
+        Saves a snapshot if n_bars is a multiple of `every` and has not
+        been saved yet (the bar count repeats when the data runs out).
+
+        Args:
+            n_bars: number of bars processed so far.
+            bars: DataHandler object.
+            strategy: Strategy object.
+            port: Portfolio object.
+            events: the event queue.
+        """
+        if n_bars % self.every == 0 and n_bars != self.last_saved:
+            self.last_saved = n_bars
+            self.save(bars, strategy, port, events)
+
+    def save(self, bars: object, strategy: object, port: object,
+             events: queue.Queue) -> None:
+        """
+        Serializes the state of every component and hands it to the writer.
+        Only the ledger rows added since the previous snapshot are included.
+        """
+        start = time.perf_counter()
+        payload = pickle.dumps({"params": self.params,
+                                "bars": bars.get_state(),
+                                "strategy": strategy.get_state(),
+                                "portfolio": port.get_state(self.ledger_rows),
+                                "events": list(events.queue)},
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        self.ledger_rows = len(port.all_holdings)
+        self.loop_seconds += time.perf_counter() - start
+        self.pending.put(payload)
+
+    def write_loop(self) -> None:
+        """
+        Body of the writer thread. A None payload stops the thread. Every
+        snapshot must be written, each one extends the previous ones.
+        """
+        while True:
+            batch = [self.pending.get()]
+            while not self.pending.empty():
+                batch.append(self.pending.get())
+            payloads = [payload for payload in batch if payload is not None]
+            if payloads:
+                self.write(payloads)
+            if len(payloads) < len(batch):
+                return
+
+    def write(self, payloads: list) -> None:
+        """
+        Compresses the payloads and appends them to the file as frames.
+        """
+        start = time.perf_counter()
+        chunks = []
+        for payload in payloads:
+            data = zlib.compress(payload, 1)
+            chunks.append(HEADER.pack(len(data), zlib.crc32(data)))
+            chunks.append(data)
+        data = b"".join(chunks)
+        self.out.write(data)
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        self.write_seconds += time.perf_counter() - start
+        self.snapshots += len(payloads)
+        self.last_size = len(data) // len(payloads)
+        self.total_bytes += len(data)
+
+    def close(self) -> None:
+        """
+        Waits for the pending snapshots to be written, stops the writer and
+        closes the file.
+        """
+        self.pending.put(None)
+        self.writer.join()
+        self.out.close()
+        log.info("%d checkpoints, last %d bytes, %.3f s on the loop, "
+                 "%.3f s in the writer", self.snapshots, self.last_size,
+                 self.loop_seconds, self.write_seconds)
+
+def read_frames(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Reads the snapshots appended by Checkpointer, stopping at the first
+    truncated or corrupted frame.
+
+    Args:
+        path: snapshot file.
+
+    Returns:
+        Iterator of (offset after the frame, snapshot) pairs.
+    """
+    with open(path, "rb") as snapshot:
+        if snapshot.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a checkpoint file" % path)
+        while True:
+            header = snapshot.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc = HEADER.unpack(header)
+            data = snapshot.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            yield snapshot.tell(), pickle.loads(zlib.decompress(data))
+
+def load(path: str, params: dict=None) -> Optional[dict]:
+    """
+    Reads the latest snapshot written by Checkpointer, with the portfolio
+    ledgers put back together from every frame.
+
+    Args:
+        path: snapshot file.
+        params: parameters of the run about to resume, None to not check.
+                Must equal the ones the snapshot was written with.
+
+    Returns:
+        The snapshot dict, with the file "offset" after its frame, None if
+        the file does not exist or holds no complete snapshot.
+    """
+    if not os.path.exists(path):
+        return None
+    state = None
+    positions, holdings = [], []
+    for offset, frame in read_frames(path):
+        portfolio = frame["portfolio"]
+        start = portfolio.pop("ledger_start")
+        positions = positions[:start] + portfolio["all_positions"]
+        holdings = holdings[:start] + portfolio["all_holdings"]
+        state = frame
+        state["offset"] = offset
+    if state is None:
+        return None
+    state["portfolio"].update(all_positions=positions, all_holdings=holdings)
+    if params is not None and state["params"] != params:
+        raise ValueError("%s was written by a different run: %r, not %r"
+                         % (path, state["params"], params))
+    return state
+
+def restore(state: dict, bars: object, strategy: object, port: object,
+            events: queue.Queue) -> None:
+    """
+    Restores freshly constructed components to a loaded snapshot.
+
+    Args:
+        state: snapshot dict returned by load().
+        bars: DataHandler object.
+        strategy: Strategy object.
+        port: Portfolio object.
+        events: the (empty) event queue.
+    """
+    bars.set_state(state["bars"])
+    strategy.set_state(state["strategy"])
+    port.set_state(state["portfolio"])
+    for event in state["events"]:
+        events.put(event)
@@ -7,12 +7,93 @@ will be completed later. Oopsie.
 """
 from abc import ABC 
 from abc import abstractmethod
-import datetime
 import os, os.path
+import numpy as np
 import pandas as pd
 
 from .events import MarketEvent
 
+def read_csv_frames(csv_dir: str, symbol_list: list,
+                    timeframe: str=None) -> dict:
+    """
+    Reads SYMBOL.csv for every symbol and reindexes all of the frames on
+    the union of their dates, padding the gaps forward.
+
+    Args:
+        csv_dir: absolute path to the CSV files (multiple!) with the data.
+        symbol_list: a list of symbol strings.
+        timeframe: read the bars aggregated by the dataserver from the
+                   csv_dir/TIMEFRAME/ directory, None for the raw bars.
+
+    Returns:
+        Dict of symbol to the aligned pandas DataFrame.
+    """
+    # TODO: figure out what this comb_index is.
+    if timeframe is not None:
+        csv_dir = os.path.join(csv_dir, timeframe)
+    comb_index = None
+    frames = {}
+    for symbol in symbol_list:
+        # Load CSV info with no headers and indexed on date.
+        frames[symbol] = pd.io.parsers.read_csv(
+                os.path.join(csv_dir, "%s.csv" % symbol),
+                header = 0, index_col = 0,
+                names=['datetime', 'open', 'low', 'high', 'close',
+                    'volume', 'oi']
+                )
+        # Recorded daily files hold bare dates and the bars pushed by the
+        # dataserver full timestamps, so a file may mix both.
+        frames[symbol].index = pd.to_datetime(frames[symbol].index,
+                                              format="ISO8601")
+        if comb_index is None:
+            comb_index = frames[symbol].index
+        else:
+            comb_index = comb_index.union(frames[symbol].index)
+
+    # Reindex the dataframes.
+    return {symbol: frame.reindex(index=comb_index, method='pad')
+            for symbol, frame in frames.items()}
+
+def load_bar_store(csv_dir: str, symbol_list: list,
+                   timeframe: str=None) -> dict:
+    """
+    Loads the CSV data once into a bar store shared by BarStoreDataHandler
+    objects: a dict of symbol to the list of all of its bars, aligned on
+    the same dates, as (symbol, datetime, open, low, high, close, volume).
+
+    Args:
+        csv_dir: absolute path to the CSV files (multiple!) with the data.
+        symbol_list: a list of symbol strings.
+        timeframe: aggregated timeframe to load, None for the raw bars.
+
+    Returns:
+        Dict of symbol to list of bar tuples.
+    """
+    store = {}
+    for symbol, frame in read_csv_frames(csv_dir, symbol_list,
+                                         timeframe).items():
+        # Floats everywhere, the same values iterrows() would produce.
+        frame = frame[['open', 'low', 'high', 'close', 'volume']].astype(float)
+        store[symbol] = [(symbol, index.to_pydatetime()) + tuple(values)
+                         for index, *values in frame.itertuples(name=None)]
+    return store
+
+def get_close_matrix(store: dict, symbol_list: list) -> np.ndarray:
+    """
+    Builds the (bars x symbols) matrix of the closes of a bar store, so
+    that the closes of every symbol at a bar are a single row. Built once
+    per store and shared by the BarStoreDataHandler objects reading it.
+
+    Args:
+        store: dict of symbol to list of bar tuples.
+        symbol_list: a list of symbol strings, the column order.
+
+    Returns:
+        float ndarray of shape (len(bars), len(symbol_list)).
+    """
+    return np.array([[bar[5] for bar in store[symbol]]
+                     for symbol in symbol_list], dtype=float).T.copy()
+
 class DataHandler(ABC):
     """
     DataHandler is an abstract base class providing an interface for all
@@ -25,6 +106,20 @@ class DataHandler(ABC):
         """Returns the specified number of bars from the symbol list."""
         raise NotImplementedError("Should implement get_latest_bars()")
 
+    def get_latest_closes(self) -> np.ndarray:
+        """
+        Returns the close of the latest bar of every symbol, in symbol_list
+        order, NaN for symbols without bars. Cross-sectional strategies
+        read the whole universe with this single call every bar; handlers
+        override it when they can serve it without a loop over symbols.
+        """
+        closes = np.full(len(self.symbol_list), np.nan)
+        for i, symbol in enumerate(self.symbol_list):
+            bars = self.get_latest_bars(symbol, n_bars=1)
+            if bars:
+                closes[i] = bars[0][5]
+        return closes
+
     @abstractmethod
     def update_bars(self) -> None:
         """
@@ -43,22 +138,30 @@ class HistoricCSVDataHandler(DataHandler):
     Additionally, the class obtains the latest bar in a manner identical
     to a live trading interface (the last class of this file).
     """
-    def __init__(self, events: object, csv_dir: str, symbol_list: list) -> None:
+    def __init__(self, events: object, csv_dir: str, symbol_list: list,
+                 timeframe: str=None) -> None:
         """
         Initializes the object with given parameters for the CSV data.
         Args:
             events: the event queue (TODO: unspecified type).
             csv_dir: absolute path to the CSV files (multiple!) with the data.
             symbol_list: a list of symbol strings.
+            timeframe: aggregated timeframe to read (see read_csv_frames),
+                       None for the raw bars.
         """
         self.events = events
         self.csv_dir = csv_dir
         self.symbol_list = symbol_list
+        self.timeframe = timeframe
 
         self.symbol_data = {}
         self.latest_symbol_data = {}
         self.continue_backtest = True
-    
+        self.bar_index = 0
+        self.latest_closes = np.full(len(symbol_list), np.nan)
+
+        self.open_convert_csv_file()
+
     def open_convert_csv_file(self) -> None:
         """
         Opens the CSV files from the data directory, converting them into
@@ -69,38 +172,25 @@ class HistoricCSVDataHandler(DataHandler):
 
         The code will look for files in the directory in the format SYMBOL.csv
         """
-        # TODO: figure out what this comb_index is.
-        comb_index = None
-        for symbol in self.symbol_list:
-            # Load CSV info with no headers and indexed on date.
-            self.symbol_data[symbol] = pd.io.parsers.read_csv(
-                    os.path.join(self.csv_dir, "%s.csv" % symbol),
-                    header = 0, index_col = 0, names=['datetime',
-                        'open', 'low', 'high', 'close', 'volume', 'oi']
-                    )
-            if comb_index is None:
-                comb_index = self.symbol_data[symbol].index
-            else:
-                comb_index.union(self.symbol_data[s].index)
+        for symbol, frame in read_csv_frames(self.csv_dir, self.symbol_list,
+                                             self.timeframe).items():
+            self.symbol_data[symbol] = self.get_new_bar(symbol,
+                                                        frame.iterrows())
             self.latest_symbol_data[symbol] = []
 
-        # Reindex the dataframes.
-        for symbol in self.symbol_list:
-            self.symbol_data[symbol] = self.symbol_data[symbol].reindex(
-                    index=comb_index, method='pad'
-                    ).iterrows()
-
-    def get_new_bar(self, symbol: str) -> tuple:
+    def get_new_bar(self, symbol: str, rows: object) -> tuple:
         """
         Returns (yields) the laters bar from the data feed as a tuple of
         (symbol, datetime, open, low, high, close, volume).
+
+        Args:
+            symbol: ticker symbol the rows belong to.
+            rows: iterator over (index, row) pairs of the reindexed frame.
         """
-        for bar in self.symbol_data[symbol]:
-            # TODO: fix the format according to yahoo finance format.
-            yield tuple([symbol, datetime.datetime.strptime(bar[0],
-                "Y-%m-%d %H:%M:%S"), bar[1][0], bar[1][1], bar[1][2],
-                bar[1][3], bar[1][4]]) 
-            
+        for index, row in rows:
+            yield tuple([symbol, index.to_pydatetime(), row["open"],
+                row["low"], row["high"], row["close"], row["volume"]])
+
     def get_latest_bars(self, symbol: str, n_bars=1) -> list:
         """
         Returns the last n_bars from the latest_symbol list using
@@ -108,27 +198,174 @@ class HistoricCSVDataHandler(DataHandler):
         """
         bars_list = None
         # NOTE: Tutorial used try/except/else just like in the next function.
-        if symbol in self.symbol_data.keys():
-            bars_list = self.symbol_data[symbol]
+        if symbol in self.latest_symbol_data.keys():
+            bars_list = self.latest_symbol_data[symbol]
         else:
             print("The %s symbol is not in the historical dataset." % symbol)
+            return []
         return bars_list[-n_bars:]
 
+    def get_latest_closes(self) -> np.ndarray:
+        """
+        Returns the latest closes, kept up to date by update_bars().
+        """
+        return self.latest_closes.copy()
+
     def update_bars(self):
         """
         Pushed the latest bar into symbol_data structure for all
         existing symbols in the structure.
         """
         # TODO: Come back later and explain this to yourself.
-        for s in self.symbol_list:
+        for i, s in enumerate(self.symbol_list):
             try:
-                bar = self.get_new_bar().next()
+                bar = next(self.symbol_data[s])
             except StopIteration:
                 self.continue_backtest = False
             else:
                 if bar is not None:
-                    self.symbol_data[s].append(bar)
+                    self.latest_symbol_data[s].append(bar)
+                    self.latest_closes[i] = bar[5]
+        if self.continue_backtest:
+            self.bar_index += 1
+            self.events.put(MarketEvent())
+
+    def get_state(self) -> dict:
+        """
+        Returns the position of the data feed for checkpointing. The bars
+        themselves are not included, they are read back from the CSVs.
+        """
+        return {"bar_index": self.bar_index,
+                "continue_backtest": self.continue_backtest}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Reopens the CSV files and fast-forwards the feed to the position
+        saved by get_state(), without generating any MarketEvent.
+        """
+        self.open_convert_csv_file()
+        for _ in range(state["bar_index"]):
+            for i, s in enumerate(self.symbol_list):
+                bar = next(self.symbol_data[s])
+                self.latest_symbol_data[s].append(bar)
+                self.latest_closes[i] = bar[5]
+        self.bar_index = state["bar_index"]
+        self.continue_backtest = state["continue_backtest"]
+
+class BarStoreDataHandler(DataHandler):
+    """
+    This class drip feeds a [start, stop) slice of a bar store built by
+    load_bar_store(). The store is shared and never copied: the handler
+    only moves a cursor over it, so many handlers (walk-forward windows,
+    parameter candidates) can run over the same data loaded once.
+
+    Bars before start are still visible through get_latest_bars(), so
+    lookback indicators are warm from the first bar of the slice.
+    """
+    def __init__(self, events: object, store: dict, symbol_list: list,
+                 start: int=0, stop: int=None,
+                 closes: np.ndarray=None) -> None:
+        """
+        Initializes the handler over a slice of the store.
+        Args:
+            events: the event queue.
+            store: dict of symbol to list of bar tuples.
+            symbol_list: a list of symbol strings.
+            start: index of the first bar to feed.
+            stop: index after the last bar to feed, defaults to the end.
+            closes: get_close_matrix(store, symbol_list), to share it
+                    between handlers. Built on first use if None.
+        """
+        self.events = events
+        self.store = store
+        self.symbol_list = symbol_list
+        self.closes = closes
+        self.start = start
+        self.stop = len(store[symbol_list[0]]) if stop is None else stop
+
+        self.cursor = start
+        self.continue_backtest = self.cursor < self.stop
+
+    def get_latest_bars(self, symbol: str, n_bars=1) -> list:
+        """
+        Returns the last n_bars up to and including the current bar.
+        """
+        if symbol not in self.store:
+            print("The %s symbol is not in the historical dataset." % symbol)
+            return []
+        if self.cursor == 0:
+            return []
+        return self.store[symbol][max(0, self.cursor - n_bars):self.cursor]
+
+    def get_latest_closes(self) -> np.ndarray:
+        """
+        Returns the row of the close matrix at the current bar. The row is
+        a view into the shared matrix and must not be modified.
+        """
+        if self.cursor == 0:
+            return np.full(len(self.symbol_list), np.nan)
+        if self.closes is None:
+            self.closes = get_close_matrix(self.store, self.symbol_list)
+        return self.closes[self.cursor - 1]
+
+    def update_bars(self) -> None:
+        """
+        Moves the cursor one bar forward and signals the new market data.
+        """
+        if self.cursor >= self.stop:
+            self.continue_backtest = False
+            return
+        self.cursor += 1
         self.events.put(MarketEvent())
+        if self.cursor >= self.stop:
+            self.continue_backtest = False
+
+    def get_state(self) -> dict:
+        """Returns the cursor over the store for checkpointing."""
+        return {"cursor": self.cursor,
+                "continue_backtest": self.continue_backtest}
+
+    def set_state(self, state: dict) -> None:
+        """Moves the cursor back to the position saved by get_state()."""
+        self.cursor = state["cursor"]
+        self.continue_backtest = state["continue_backtest"]
+
+class ReplayDataHandler(DataHandler):
+    """
+    This class is fed by trade.journal.replay() with the bars recorded in
+    an event journal, so that a recorded run can be replayed through the
+    same Strategy/Portfolio/ExecutionHandler stack without the original
+    data source.
+    """
+    def __init__(self, events: object, symbol_list: list) -> None:
+        """
+        Initializes the handler with no bars.
+        Args:
+            events: the event queue.
+            symbol_list: a list of symbol strings.
+        """
+        self.events = events
+        self.symbol_list = symbol_list
+        self.latest_symbol_data = {s: [] for s in symbol_list}
+        self.continue_backtest = True
+
+    def get_latest_bars(self, symbol: str, n_bars=1) -> list:
+        """
+        Returns the last n_bars pushed for the symbol.
+        """
+        if symbol not in self.latest_symbol_data:
+            print("The %s symbol is not in the historical dataset." % symbol)
+            return []
+        return self.latest_symbol_data[symbol][-n_bars:]
+
+    def update_bars(self, latest: dict=None) -> None:
+        """
+        Appends the recorded bars, a dict of symbol to the list returned
+        by get_latest_bars(symbol) at the time of the recording. The
+        MarketEvent comes from the journal as well, so none is put here.
+        """
+        for symbol, bars in (latest or {}).items():
+            self.latest_symbol_data[symbol].extend(bars)
 
 class HistoricDBDataHandler(DataHandler):
     """
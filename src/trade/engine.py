@@ -1,14 +1,27 @@
 """
 Main file that uses zmq message queue and an infinite loop to
 implement the trading engine with strategies and analysis.
+
+Heavy dependencies (zmq, pandas through the data handlers) are imported
+inside the functions that need them, so that short-lived invocations of
+`python -m trade` do not pay for what they do not use.
 """
-import zmq
+from typing import Callable, Dict, List, Tuple
+import json
+import os
+import queue
 
 from utilities import logger
 
 log = logger.get_logger_config(__name__)
 
 def run() -> None:
+    """
+    Connects to the dataserver and pings it a few times, see
+    dataserver.driver.handle_request for the protocol.
+    """
+    import zmq
+
     # Setup zmq variables.
     ctx = zmq.Context()
     log.info("Connecting to the data server...")
@@ -17,9 +30,253 @@ def run() -> None:
 
     # Initial testing. Loop 10 times for each request.
     for request in range(10):
-        log.info("Send request %d..." % request)
-        socket.send(b"{engine data}.")
+        log.info("Send request %d...", request)
+        socket.send(json.dumps({"id": request, "method": "ping"}).encode())
 
         # Obtain reply.
-        message = socket.recv()
-        log.info("Received reply %s [ %s ]" % (request, message))
\ No newline at end of file
+        reply = json.loads(socket.recv())
+        if reply.get("id") != request or reply.get("result") != "pong":
+            log.error("Unexpected reply to ping %d: %r", request, reply)
+        else:
+            log.info("Received reply %d [ %s ]", request, reply["result"])
+
+def backtest(csv_dir: str, symbol_list: list, start_date: object=None,
+             initial_capital: float=100000.0, strategy_cls: type=None,
+             checkpoint: str=None, checkpoint_every: int=1000,
+             timeframe: str=None, journal: str=None) -> object:
+    """
+    Runs the event-driven backtest loop over the CSV data until the data
+    handler runs out of bars. Every bar the queue is drained completely
+    before the next bar is pushed.
+
+    With a checkpoint file, a snapshot of the whole backtest is written
+    every checkpoint_every bars, and if the file already exists the run
+    resumes from it instead of starting from the first bar. Resuming with
+    other data, symbols, strategy or capital raises ValueError.
+
+    Args:
+        csv_dir: directory with SYMBOL.csv files.
+        symbol_list: list of symbols to trade.
+        start_date: datetime of the start of portfolio.
+        initial_capital: starting cash of the portfolio.
+        strategy_cls: Strategy subclass taking (bars, events), defaults to
+                      BuyAndHoldStrategy.
+        checkpoint: path of the snapshot file, None to disable.
+        checkpoint_every: number of bars between two snapshots.
+        timeframe: bars aggregated by the dataserver to run on, None for
+                   the raw bars. Example: 1h.
+        journal: path of an event journal to record the run into, see
+                 trade.journal. None to disable. A journal has to cover
+                 the run from its first bar, so it cannot be combined with
+                 resuming from a checkpoint.
+
+    Returns:
+        NaivePortfolio with the equity curve already computed.
+    """
+    from .data import HistoricCSVDataHandler
+    from .execution import SimulatedExecutionHandler
+    from .portfolio import NaivePortfolio
+    from .strategy import BuyAndHoldStrategy
+
+    strategy_cls = strategy_cls or BuyAndHoldStrategy
+
+    events = queue.Queue()
+    bars = HistoricCSVDataHandler(events, csv_dir, symbol_list, timeframe)
+    strategy = strategy_cls(bars, events)
+    port = NaivePortfolio(bars, events, start_date, initial_capital)
+    broker = SimulatedExecutionHandler(events, bars)
+
+    checkpointer = None
+    if checkpoint is not None:
+        from . import checkpoint as ckpt
+
+        params = {"csv_dir": os.path.abspath(csv_dir),
+                  "symbol_list": list(symbol_list), "timeframe": timeframe,
+                  "strategy": "%s.%s" % (strategy_cls.__module__,
+                                         strategy_cls.__qualname__),
+                  "start_date": start_date,
+                  "initial_capital": initial_capital}
+        state = ckpt.load(checkpoint, params)
+        if state is not None and journal is not None:
+            raise ValueError("Cannot record a journal of a run resumed "
+                             "from %s" % checkpoint)
+        if state is not None:
+            ckpt.restore(state, bars, strategy, port, events)
+            log.info("Resumed from %s at bar %d", checkpoint, bars.bar_index)
+        checkpointer = ckpt.Checkpointer(checkpoint, checkpoint_every,
+                                         params, state)
+
+    recorder = None
+    if journal is not None:
+        from .journal import EventJournal
+
+        recorder = EventJournal(journal)
+        recorder.record_start(symbol_list, initial_capital, start_date,
+                              strategy_cls)
+
+    while True:
+        # Update the market bars.
+        if bars.continue_backtest:
+            bars.update_bars()
+        else:
+            break
+        if recorder is not None:
+            recorder.record_bars(bars)
+
+        # Handle the events.
+        handle_events(events, strategy, port, broker, recorder)
+
+        if checkpointer is not None:
+            checkpointer.maybe_save(bars.bar_index, bars, strategy, port,
+                                    events)
+
+    if checkpointer is not None:
+        checkpointer.close()
+    if recorder is not None:
+        recorder.record_holdings(port)
+        recorder.close()
+    port.get_equity_curve_df()
+    return port
+
+def handle_events(events: queue.Queue, strategy: object, port: object,
+                  broker: object, journal: object=None) -> None:
+    """
+    Drains the event queue, routing every event to the component that
+    handles it. Events generated on the way are handled in the same call.
+
+    Args:
+        events: the event queue of the stack.
+        strategy: Strategy object.
+        port: Portfolio object.
+        broker: ExecutionHandler object.
+        journal: EventJournal recording every handled event, or None.
+    """
+    while True:
+        try:
+            event = events.get(False)
+        except queue.Empty:
+            break
+        if journal is not None:
+            journal.record(event)
+        if event.type == "MARKET":
+            strategy.calculate_signals(event)
+            port.update_timeindex(event)
+        elif event.type == "SIGNAL":
+            port.update_signal(event)
+        elif event.type == "ORDER":
+            broker.execute_order(event)
+        elif event.type == "FILL":
+            port.update_fill(event)
+
+def backtest_many(csv_dir: str, symbol_list: list,
+                  strategies: Dict[str, Callable], start_date: object=None,
+                  initial_capital: float=100000.0,
+                  timeframe: str=None) -> Dict[str, object]:
+    """
+    Runs many strategies over a single pass of the data. The CSV files are
+    parsed once and one data handler is advanced once per bar; every
+    MarketEvent is then fanned out to a (Strategy, Portfolio,
+    ExecutionHandler) stack per strategy. Each stack has its own event
+    queue, so orders and fills of one strategy never reach another.
+
+    Args:
+        csv_dir: directory with SYMBOL.csv files.
+        symbol_list: list of symbols to trade.
+        strategies: dict of name to Strategy subclass (or any callable)
+                    taking (bars, events).
+        start_date: datetime of the start of portfolio.
+        initial_capital: starting cash of every portfolio.
+        timeframe: aggregated timeframe to run on, None for the raw bars.
+
+    Returns:
+        Dict of name to NaivePortfolio with the equity curve computed.
+    """
+    from .data import HistoricCSVDataHandler
+
+    market_events = queue.Queue()
+    bars = HistoricCSVDataHandler(market_events, csv_dir, symbol_list,
+                                  timeframe)
+    return run_many(bars, market_events, strategies, start_date,
+                    initial_capital)
+
+def run_many(bars: object, market_events: queue.Queue,
+             strategies: Dict[str, Callable], start_date: object=None,
+             initial_capital: float=100000.0) -> Dict[str, object]:
+    """
+    Fans the market events of an already constructed data handler out to
+    one stack per strategy until the handler runs out of bars. See
+    backtest_many() for the details.
+
+    Args:
+        bars: DataHandler putting its MarketEvents on market_events.
+        market_events: the event queue of the data handler.
+        strategies: dict of name to callable taking (bars, events).
+        start_date: datetime of the start of portfolio.
+        initial_capital: starting cash of every portfolio.
+
+    Returns:
+        Dict of name to NaivePortfolio with the equity curve computed.
+    """
+    from .execution import SimulatedExecutionHandler
+    from .portfolio import NaivePortfolio
+
+    stacks = {}
+    for name, strategy_cls in strategies.items():
+        events = queue.Queue()
+        stacks[name] = (events, strategy_cls(bars, events),
+                        NaivePortfolio(bars, events, start_date,
+                                       initial_capital),
+                        SimulatedExecutionHandler(events, bars))
+
+    while bars.continue_backtest:
+        bars.update_bars()
+        while True:
+            try:
+                event = market_events.get(False)
+            except queue.Empty:
+                break
+            for events, strategy, port, broker in stacks.values():
+                events.put(event)
+                handle_events(events, strategy, port, broker)
+
+    results = {}
+    for name, (_, _, port, _) in stacks.items():
+        port.get_equity_curve_df()
+        results[name] = port
+    return results
+
+def _sweep_job(job: Tuple[str, list, float]) -> Tuple[list, list]:
+    """
+    Runs a single backtest inside a worker process of sweep().
+
+    Args:
+        job: (csv_dir, symbol_list, initial_capital) tuple.
+
+    Returns:
+        (symbol_list, summary stats) tuple.
+    """
+    csv_dir, symbol_list, initial_capital = job
+    port = backtest(csv_dir, symbol_list, initial_capital=initial_capital)
+    return symbol_list, port.print_summary_stats()
+
+def sweep(csv_dir: str, symbol_groups: List[list],
+          initial_capital: float=100000.0,
+          processes: int=None) -> List[Tuple[list, list]]:
+    """
+    Runs an independent backtest for every group of symbols, spread over
+    a pool of processes.
+
+    Args:
+        csv_dir: directory with SYMBOL.csv files.
+        symbol_groups: list of symbol lists, one backtest each.
+        initial_capital: starting cash of every portfolio.
+        processes: number of worker processes, defaults to the CPU count.
+
+    Returns:
+        List of (symbol_list, summary stats) tuples in the input order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = [(csv_dir, group, initial_capital) for group in symbol_groups]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_sweep_job, jobs))
@@ -32,7 +32,8 @@ class SignalEvent(Event):
     by a portfolio for further processing (i.e. SignalEvent acts as an advice).
     """
     def __init__(self, symbol: str, datetime: str,
-                 signal_type: Literal['LONG', 'SHORT']) -> None:
+                 signal_type: Literal['LONG', 'SHORT', 'EXIT'],
+                 strength: float=1.0) -> None:
         """
         Initializes the signal event and some of its fields.
 
@@ -42,11 +43,13 @@ class SignalEvent(Event):
             symbol: ticker symbol of the stock, etc. Example: GOOG.
             datetime: string that stores the timestamp when the event was created.
             signal_type: indicated the direction for the advice for the stock.
+            strength: multiplier for the order size used by the portfolio.
         """
         self.type = 'SIGNAL'
         self.symbol = symbol
         self.datetime = datetime
         self.signal_type = signal_type
+        self.strength = strength
 
 class OrderEvent(Event):
     """
@@ -54,7 +57,8 @@ class OrderEvent(Event):
     online on the brokerage system or some other way of executing the order.
     """
     def __init__(self, symbol: str, order_type: Literal['MKT', 'LMT'],
-                 quantity: int, direction: Literal['BUY', 'SELL']) -> None:
+                 quantity: int, direction: Literal['BUY', 'SELL'],
+                 order_id: int=None) -> None:
         """
         Initializes the Order Event that is sent to the execution program to
         place an order for the stock, etc.
@@ -64,12 +68,14 @@ class OrderEvent(Event):
             order_type: union for two values: MKT - market and LMT - limit.
             quantity: non-negative integer for quantity.
             direction: union type for long or short.
+            order_id: identifier assigned by the OrderManager (trade.oms).
         """
         self.type = 'ORDER'
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
         self.direction = direction
+        self.order_id = order_id
 
     def print_order(self) -> None:
         """
@@ -87,7 +93,8 @@ class FillEvent(Event):
     """
     def __init__(self, timeindex: object, symbol: str, exchange: str,
                  quantity: int, direction: Literal['BUY', 'SELL'],
-                 fill_cost: int, commission: float) -> None:
+                 fill_cost: int, commission: float=None,
+                 order_id: int=None) -> None:
         """
         Initializes the FillEvent object. If commision is not provided, it will
         be calculated based on the trade size and trading API fees.
@@ -100,6 +107,7 @@ class FillEvent(Event):
             direction: the direction of fill order.
             fill_cost: the holdings value in dollars.
             commission: an optional commission sent from IB.
+            order_id: identifier of the order this fill belongs to.
         """
         self.type = 'FILL'
         self.timeindex = timeindex
@@ -108,6 +116,7 @@ class FillEvent(Event):
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
+        self.order_id = order_id
 
         # Calculating the commission if it not provided.
         self.commission = self.calculate_commission() if \
@@ -124,6 +133,8 @@ class FillEvent(Event):
         """
         coeff_cost = 0.013 if self.quantity <= 500 else 0.008
         full_cost = max(1.3, coeff_cost * self.quantity)
-        full_cost = min(full_cost, 0.5 / 100.0 * self.quantity * self.fill_cost)
-        
+        if self.fill_cost is not None:
+            full_cost = min(full_cost,
+                            0.5 / 100.0 * self.quantity * self.fill_cost)
+
         return full_cost
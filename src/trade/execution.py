@@ -12,8 +12,9 @@ Todo:
 from abc import ABC, abstractmethod
 import datetime
 import queue
+import random
 
-from events import FillEvent, OrderEvent, Event
+from .events import FillEvent, OrderEvent, Event
 
 class ExecutionHandler(ABC):
     """
@@ -45,14 +46,18 @@ class SimulatedExecutionHandler(ExecutionHandler):
     This allows a straightforward "first go" test of any strategy,
     before implementation with a more sophisticated execution handler.
     """
-    def __init__(self, events: queue) -> None:
+    def __init__(self, events: queue, bars: object=None) -> None:
         """
         Initializes the handler while setting up the event queue.
         
         Args:
             events: the event queue for the duration of the program.
+            bars: DataHandler object. If given, fills are stamped with the
+                  time of the current bar instead of the wall clock, which
+                  keeps backtests and replays deterministic.
         """
         self.events = events
+        self.bars = bars
     
     def execute_order(self, event: Event) -> None:
         """
@@ -66,8 +71,53 @@ class SimulatedExecutionHandler(ExecutionHandler):
             Remove the if event.type == ... statement.
         """
         if event.type == "ORDER":
+            timeindex = datetime.datetime.utcnow()
+            if self.bars is not None:
+                timeindex = self.bars.get_latest_bars(event.symbol)[0][1]
             # "ARCA" string is simply a placeholder
-            fill_event = FillEvent(datetime.datetime.utcnow(), event.symbol,
-                    "ARCA", event.quantity, event.direction, None)
+            fill_event = FillEvent(timeindex, event.symbol,
+                    "ARCA", event.quantity, event.direction, None,
+                    order_id=event.order_id)
             self.events.put(fill_event)
 
+class PartialFillExecutionHandler(SimulatedExecutionHandler):
+    """
+    Simulated broker that fills every order in several random pieces, the
+    way large orders come back from a real brokerage. Used as a stand-in
+    to exercise partial fill handling in the OrderManager (trade.oms).
+    """
+    def __init__(self, events: queue, bars: object=None,
+                 max_fill: int=100, seed: int=0) -> None:
+        """
+        Initializes the handler.
+
+        Args:
+            events: the event queue for the duration of the program.
+            bars: DataHandler object, see SimulatedExecutionHandler.
+            max_fill: largest quantity of a single fill.
+            seed: seed of the random fill sizes, for reproducible runs.
+        """
+        super().__init__(events, bars)
+        self.max_fill = max_fill
+        self.random = random.Random(seed)
+
+    def execute_order(self, event: Event) -> None:
+        """
+        Converts an OrderEvent into FillEvents of random sizes adding up
+        to the quantity of the order.
+
+        Args:
+            event: OrderEvent object that is used to create the fills.
+        """
+        if event.type == "ORDER":
+            timeindex = datetime.datetime.utcnow()
+            if self.bars is not None:
+                timeindex = self.bars.get_latest_bars(event.symbol)[0][1]
+            remaining = event.quantity
+            while remaining > 0:
+                quantity = min(remaining, self.random.randint(1, self.max_fill))
+                remaining -= quantity
+                self.events.put(FillEvent(timeindex, event.symbol, "ARCA",
+                        quantity, event.direction, None,
+                        order_id=event.order_id))
+
@@ -0,0 +1,253 @@
+"""
+Append-only journal of everything that goes through the event queue, and a
+replay driver that runs a journal back through the engine. Every entry has
+a sequence number and a monotonic timestamp (time.monotonic_ns), so runs can
+be replayed in order and, if needed, with the original pacing.
+
+File layout: MAGIC, then entries of a fixed header (sequence number,
+timestamp, kind, payload length) followed by the pickled payload. Kinds:
+    S: start of the run (symbol_list, initial_capital, start_date and the
+       qualified name of the strategy class).
+    B: bars seen by the strategy for the next MarketEvent.
+    E: an event, in the order the engine handled it.
+    H: final positions and holdings of the portfolio.
+
+Only the sequence number and the timestamp are taken on the engine thread;
+pickling and writing happen on a background thread, in batches.
+"""
+from typing import Iterator, Tuple
+import importlib
+import itertools
+import pickle
+import queue
+import struct
+import threading
+import time
+
+MAGIC = b"TRJR\x01"
+HEADER = struct.Struct("<QqcI")
+BATCH_SIZE = 1024
+
+def get_class_name(cls: type) -> str:
+    """Returns the qualified name of a class. Example: trade.strategy.X."""
+    return "%s.%s" % (cls.__module__, cls.__qualname__)
+
+def load_class(name: str) -> type:
+    """
+    Imports the class named by get_class_name().
+
+    Args:
+        name: qualified class name. Example: trade.strategy.X.
+    """
+    module, _, qualname = name.rpartition(".")
+    while module:
+        try:
+            obj = importlib.import_module(module)
+            break
+        except ImportError:
+            module, _, outer = module.rpartition(".")
+            qualname = "%s.%s" % (outer, qualname)
+    else:
+        raise ImportError("cannot import %s" % name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+class EventJournal:
+    """
+    Records journal entries and writes them from a background thread.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Opens (truncates) the journal file and starts the writer thread.
+
+        Args:
+            path: journal file.
+        """
+        self.path = path
+        self.sequence = itertools.count()
+        self.pending = queue.SimpleQueue()
+        self.out = open(path, "wb")
+        self.out.write(MAGIC)
+        self.writer = threading.Thread(target=self.write_loop,
+                                       name="journal-writer", daemon=True)
+        self.writer.start()
+
+    def record(self, event: object, kind: bytes=b"E") -> None:
+        """
+        Queues an entry for writing. The payload must not be modified
+        afterwards, it is pickled later on the writer thread.
+
+        Args:
+            event: Event object, or the payload of the other kinds.
+            kind: entry kind, see the module docstring.
+        """
+        self.pending.put((next(self.sequence), time.monotonic_ns(), kind,
+                          event))
+
+    def record_start(self, symbol_list: list, initial_capital: float,
+                     start_date: object, strategy_cls: type) -> None:
+        """
+        Records the parameters needed to rebuild the strategy and the
+        portfolio of the run.
+        """
+        self.record({"symbol_list": list(symbol_list),
+                     "initial_capital": initial_capital,
+                     "start_date": start_date,
+                     "strategy": get_class_name(strategy_cls)}, b"S")
+
+    def record_bars(self, bars: object) -> None:
+        """Records the latest bar of every symbol of the data handler."""
+        self.record({s: bars.get_latest_bars(s, n_bars=1)
+                     for s in bars.symbol_list}, b"B")
+
+    def record_holdings(self, port: object) -> None:
+        """Records the final positions and holdings of the portfolio."""
+        self.record({"positions": dict(port.current_positions),
+                     "holdings": dict(port.current_holdings)}, b"H")
+
+    def write_loop(self) -> None:
+        """
+        Body of the writer thread: writes whatever has been queued, up to
+        BATCH_SIZE entries at once. A None entry stops the thread.
+        """
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < BATCH_SIZE and not self.pending.empty():
+                batch.append(self.pending.get())
+            stop = batch[-1] is None
+            chunks = []
+            for entry in batch:
+                if entry is None:
+                    continue
+                sequence, timestamp, kind, payload = entry
+                data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+                chunks.append(HEADER.pack(sequence, timestamp, kind,
+                                          len(data)))
+                chunks.append(data)
+            self.out.write(b"".join(chunks))
+            self.out.flush()
+            if stop:
+                return
+
+    def close(self) -> None:
+        """
+        Writes the remaining entries, stops the writer and closes the file.
+        """
+        self.pending.put(None)
+        self.writer.join()
+        self.out.close()
+
+def read_journal(path: str) -> Iterator[Tuple[int, int, bytes, object]]:
+    """
+    Reads a journal written by EventJournal. A truncated last entry (e.g.
+    after a crash) is ignored.
+
+    Args:
+        path: journal file.
+
+    Returns:
+        Iterator of (sequence, timestamp, kind, payload) tuples.
+    """
+    with open(path, "rb") as journal:
+        if journal.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not an event journal" % path)
+        while True:
+            header = journal.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            sequence, timestamp, kind, length = HEADER.unpack(header)
+            data = journal.read(length)
+            if len(data) < length:
+                return
+            yield sequence, timestamp, kind, pickle.loads(data)
+
+class _Recorder:
+    """Collects the events handled during a replay."""
+    def __init__(self) -> None:
+        self.events = []
+
+    def record(self, event: object, kind: bytes=b"E") -> None:
+        self.events.append(event)
+
+def replay(path: str, strategy_cls: type=None, speed: float=None) -> dict:
+    """
+    Runs the journal back through a fresh Strategy/NaivePortfolio/
+    SimulatedExecutionHandler stack. The recorded bars and MarketEvents
+    drive the run; the signals, orders and fills it produces are compared
+    with the recorded ones, and so are the final holdings.
+
+    Args:
+        path: journal file.
+        strategy_cls: Strategy subclass taking (bars, events), defaults to
+                      the one named in the journal (BuyAndHoldStrategy for
+                      journals that name none).
+        speed: None to replay as fast as possible, otherwise a multiple of
+               the recorded pace. Example: 10.0 for ten times faster.
+
+    Returns:
+        Dict with the replayed "portfolio", the number of "events",
+        "events_match", "fills_match", "holdings_match", and the index of
+        the first differing event in "mismatch" (None if there is none).
+    """
+    from .data import ReplayDataHandler
+    from .engine import handle_events
+    from .execution import SimulatedExecutionHandler
+    from .portfolio import NaivePortfolio
+    from .strategy import BuyAndHoldStrategy
+
+    entries = read_journal(path)
+    _, first_timestamp, kind, start = next(entries)
+    if kind != b"S":
+        raise ValueError("%s does not start with a run header" % path)
+    if strategy_cls is None:
+        strategy_cls = load_class(start["strategy"]) \
+            if "strategy" in start else BuyAndHoldStrategy
+
+    events = queue.Queue()
+    bars = ReplayDataHandler(events, start["symbol_list"])
+    strategy = strategy_cls(bars, events)
+    port = NaivePortfolio(bars, events, start["start_date"],
+                          start["initial_capital"])
+    broker = SimulatedExecutionHandler(events, bars)
+
+    recorder = _Recorder()
+    expected = []
+    final = None
+    replay_start = time.monotonic_ns()
+    for _, timestamp, kind, payload in entries:
+        if kind == b"B":
+            bars.update_bars(payload)
+        elif kind == b"H":
+            final = payload
+        elif kind == b"E":
+            expected.append(payload)
+            if payload.type != "MARKET":
+                continue
+            if speed is not None:
+                due = replay_start + (timestamp - first_timestamp) / speed
+                delay = (due - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            events.put(payload)
+            handle_events(events, strategy, port, broker, recorder)
+
+    produced = recorder.events
+    mismatch = None
+    for i, (old, new) in enumerate(zip(expected, produced)):
+        if type(old) is not type(new) or vars(old) != vars(new):
+            mismatch = i
+            break
+    if mismatch is None and len(expected) != len(produced):
+        mismatch = min(len(expected), len(produced))
+
+    expected_fills = [vars(e) for e in expected if e.type == "FILL"]
+    produced_fills = [vars(e) for e in produced if e.type == "FILL"]
+    port.get_equity_curve_df()
+    return {"portfolio": port, "events": len(produced),
+            "events_match": mismatch is None,
+            "fills_match": expected_fills == produced_fills,
+            "holdings_match": final is not None and
+                final["positions"] == port.current_positions and
+                final["holdings"] == port.current_holdings,
+            "mismatch": mismatch}
@@ -0,0 +1,272 @@
+"""
+Order management between the Portfolio and the ExecutionHandler. Every order
+gets an identifier before it goes on the event queue, and the fills coming
+back carry it, so partial fills, cancels and duplicate orders can be tracked.
+
+Orders are indexed by identifier, by status, and (while open) by symbol,
+all with dicts, so every update is O(1). Positions and the open-order
+exposure (the signed quantity still to be filled) are updated incrementally
+from the orders and fills, and the risk check at submission uses both.
+
+Closed orders (filled, cancelled or rejected) are only kept for reporting.
+With keep_closed set, the oldest of them are dropped from the indexes so
+that the book (and every checkpoint of it) stays bounded on long runs; the
+open orders are never dropped.
+"""
+from typing import Dict, List, Literal
+import queue
+
+from utilities import logger
+
+from .events import FillEvent, OrderEvent
+
+log = logger.get_logger_config(__name__)
+
+OPEN_STATUSES = ("NEW", "PARTIAL")
+STATUSES = OPEN_STATUSES + ("FILLED", "CANCELLED", "REJECTED")
+
+class Order:
+    """
+    State of a single order, as seen by the OrderManager.
+    """
+    __slots__ = ("order_id", "symbol", "order_type", "quantity", "direction",
+                 "filled", "status")
+
+    def __init__(self, order_id: int, event: OrderEvent) -> None:
+        """
+        Initializes the order from the OrderEvent it was submitted with.
+
+        Args:
+            order_id: identifier assigned by the OrderManager.
+            event: the submitted OrderEvent.
+        """
+        self.order_id = order_id
+        self.symbol = event.symbol
+        self.order_type = event.order_type
+        self.quantity = event.quantity
+        self.direction = event.direction
+        self.filled = 0
+        self.status: Literal["NEW", "PARTIAL", "FILLED", "CANCELLED",
+                             "REJECTED"] = "NEW"
+
+    @property
+    def remaining(self) -> int:
+        """Quantity still to be filled."""
+        return self.quantity - self.filled
+
+    @property
+    def sign(self) -> int:
+        """1 for BUY orders, -1 for SELL orders."""
+        return 1 if self.direction == "BUY" else -1
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+class OrderManager:
+    """
+    Assigns identifiers to orders, sends them to the execution handler
+    through the event queue, and reconciles the fills.
+    """
+    def __init__(self, events: queue.Queue, max_position: int=None,
+                 allow_duplicates: bool=False, keep_closed: int=None) -> None:
+        """
+        Initializes the empty order book.
+
+        Args:
+            events: the event queue read by the ExecutionHandler.
+            max_position: largest absolute position per symbol, counting
+                          open orders. None for no limit.
+            allow_duplicates: accept an order while an open order for the
+                              same symbol, direction and quantity exists.
+            keep_closed: number of closed orders kept, the oldest ones
+                         are dropped first. None to keep all of them.
+        """
+        self.events = events
+        self.max_position = max_position
+        self.allow_duplicates = allow_duplicates
+        self.keep_closed = keep_closed
+
+        self.next_id = 1
+        self.orders: Dict[int, Order] = {}
+        self.by_status: Dict[str, Dict[int, Order]] = {s: {} for s in STATUSES}
+        self.open_by_symbol: Dict[str, Dict[int, Order]] = {}
+        # Number of open orders per (symbol, direction, quantity).
+        self.open_keys: Dict[tuple, int] = {}
+        self.positions: Dict[str, int] = {}
+        self.exposure: Dict[str, int] = {}
+        # Closed orders in the order they were closed, with keep_closed.
+        self.closed: Dict[int, Order] = {}
+
+    def set_status(self, order: Order, status: str) -> None:
+        """
+        Moves the order to another status, keeping the indexes in sync.
+        """
+        del self.by_status[order.status][order.order_id]
+        self.by_status[status][order.order_id] = order
+        if order.status in OPEN_STATUSES and status not in OPEN_STATUSES \
+                and order.order_id in self.open_by_symbol.get(order.symbol, {}):
+            del self.open_by_symbol[order.symbol][order.order_id]
+            key = (order.symbol, order.direction, order.quantity)
+            self.open_keys[key] -= 1
+            if not self.open_keys[key]:
+                del self.open_keys[key]
+        order.status = status
+        if self.keep_closed is not None and status not in OPEN_STATUSES:
+            self.closed[order.order_id] = order
+            while len(self.closed) > self.keep_closed:
+                self.drop(next(iter(self.closed.values())))
+
+    def drop(self, order: Order) -> None:
+        """
+        Removes a closed order from every index. Its late fills still
+        count in the positions.
+        """
+        del self.closed[order.order_id]
+        del self.orders[order.order_id]
+        del self.by_status[order.status][order.order_id]
+
+    def is_duplicate(self, event: OrderEvent) -> bool:
+        """
+        Returns True if an identical order (symbol, direction, quantity)
+        is still open.
+        """
+        return (event.symbol, event.direction, event.quantity) in \
+            self.open_keys
+
+    def check_risk(self, event: OrderEvent) -> bool:
+        """
+        Returns True if the position after every open order and this one
+        are filled stays within max_position.
+        """
+        if self.max_position is None:
+            return True
+        sign = 1 if event.direction == "BUY" else -1
+        projected = self.get_position(event.symbol) + \
+            self.get_open_exposure(event.symbol) + sign * event.quantity
+        return abs(projected) <= self.max_position
+
+    def submit(self, event: OrderEvent) -> Order:
+        """
+        Registers the order and puts it on the event queue with its
+        identifier. Duplicates and orders failing the risk check are
+        recorded as REJECTED and not sent.
+
+        Args:
+            event: OrderEvent generated by the portfolio.
+
+        Returns:
+            The Order object.
+        """
+        order_id = self.next_id
+        self.next_id += 1
+        event.order_id = order_id
+        order = Order(order_id, event)
+        self.orders[order_id] = order
+        self.by_status["NEW"][order_id] = order
+
+        if (not self.allow_duplicates and self.is_duplicate(event)) or \
+                not self.check_risk(event):
+            log.warning("Rejected order %d: %s %d %s", order_id,
+                        event.direction, event.quantity, event.symbol)
+            self.set_status(order, "REJECTED")
+            return order
+
+        self.open_by_symbol.setdefault(order.symbol, {})[order_id] = order
+        key = (order.symbol, order.direction, order.quantity)
+        self.open_keys[key] = self.open_keys.get(key, 0) + 1
+        self.exposure[order.symbol] = self.get_open_exposure(order.symbol) + \
+            order.sign * order.quantity
+        self.events.put(event)
+        return order
+
+    def cancel(self, order_id: int) -> bool:
+        """
+        Cancels the unfilled part of an open order. Fills that still come
+        in for it are applied to the positions.
+
+        Args:
+            order_id: identifier of the order.
+
+        Returns:
+            True if the order was open and is now cancelled.
+        """
+        order = self.orders.get(order_id)
+        if order is None or order.status not in OPEN_STATUSES:
+            return False
+        self.exposure[order.symbol] -= order.sign * order.remaining
+        self.set_status(order, "CANCELLED")
+        return True
+
+    def update_fill(self, fill: FillEvent) -> None:
+        """
+        Reconciles a fill: updates the order, its status, the open
+        exposure and the position of the symbol.
+
+        Args:
+            fill: FillEvent carrying the order_id of its order.
+        """
+        sign = 1 if fill.direction == "BUY" else -1
+        self.positions[fill.symbol] = self.get_position(fill.symbol) + \
+            sign * fill.quantity
+
+        order = self.orders.get(fill.order_id)
+        if order is None and self.keep_closed is not None and \
+                fill.order_id is not None and fill.order_id < self.next_id:
+            # Late fill of a closed order dropped since.
+            return
+        if order is None:
+            log.warning("Fill for unknown order %s of %s", fill.order_id,
+                        fill.symbol)
+            return
+        if order.status not in OPEN_STATUSES:
+            # Late fill of a cancelled order, already out of the exposure.
+            order.filled += fill.quantity
+            return
+
+        quantity = fill.quantity
+        if quantity > order.remaining:
+            log.warning("Overfill of order %d: %d filled, %d remaining",
+                        order.order_id, quantity, order.remaining)
+            quantity = order.remaining
+        order.filled += quantity
+        self.exposure[order.symbol] -= order.sign * quantity
+        self.set_status(order, "FILLED" if order.remaining == 0
+                        else "PARTIAL")
+
+    def get_position(self, symbol: str) -> int:
+        """Returns the filled position of the symbol."""
+        return self.positions.get(symbol, 0)
+
+    def get_open_exposure(self, symbol: str) -> int:
+        """
+        Returns the signed quantity of the symbol still to be filled by
+        the open orders (positive to buy, negative to sell).
+        """
+        return self.exposure.get(symbol, 0)
+
+    def get_open_orders(self, symbol: str=None) -> List[Order]:
+        """
+        Returns the open orders, of a single symbol or of all of them.
+        """
+        if symbol is not None:
+            return list(self.open_by_symbol.get(symbol, {}).values())
+        return [order for status in OPEN_STATUSES
+                for order in self.by_status[status].values()]
+
+    def get_orders(self, status: str) -> List[Order]:
+        """Returns the orders with the given status."""
+        return list(self.by_status[status].values())
+
+    def get_state(self) -> dict:
+        """
+        Returns the order book for checkpointing.
+        """
+        return {k: v for k, v in vars(self).items() if k != "events"}
+
+    def set_state(self, state: dict) -> None:
+        """Restores the order book returned by get_state()."""
+        vars(self).update(state)
@@ -0,0 +1,139 @@
+"""
+Throughput test for the OrderManager. Pushes random orders through the OMS
+and a PartialFillExecutionHandler standing in for the broker, cancelling a
+fraction of the orders after their first fill, then checks that the
+positions and indexes of the OMS agree with the fills and reports the order
+rate. The OMS is set up like the one of NaivePortfolio (duplicates are
+rejected) plus a position limit, so both rejection paths are exercised.
+With --keep-closed, the closed orders are dropped from the book as they
+pile up and the check covers the retained ones.
+
+Usage, from the src/ directory:
+    python -m trade.omsbench --orders 100000 --symbols 50 --in-flight 64
+"""
+import argparse
+import logging
+import queue
+import random
+import sys
+import time
+
+from utilities import logger
+
+from .events import OrderEvent
+from .execution import PartialFillExecutionHandler
+from .oms import OPEN_STATUSES, STATUSES, OrderManager
+
+def check(oms: OrderManager, fills: dict) -> list:
+    """
+    Checks the OMS against the fills the broker sent.
+
+    Args:
+        oms: OrderManager after the run.
+        fills: signed filled quantity per symbol, summed from the fills.
+
+    Returns:
+        List of error messages, empty if everything is consistent.
+    """
+    errors = []
+    positions = {s: q for s, q in oms.positions.items() if q}
+    if positions != {s: q for s, q in fills.items() if q}:
+        errors.append("positions differ from the sum of the fills")
+    indexed = sum(len(oms.by_status[status]) for status in STATUSES)
+    if indexed != len(oms.orders):
+        errors.append("%d orders, %d in the status index" % (len(oms.orders),
+                                                             indexed))
+    for status in STATUSES:
+        for order in oms.by_status[status].values():
+            if order.status != status:
+                errors.append("order %d indexed as %s" % (order.order_id,
+                                                          status))
+    open_orders = {order.order_id for order in oms.get_open_orders()}
+    by_symbol = {order_id for orders in oms.open_by_symbol.values()
+                 for order_id in orders}
+    if open_orders != by_symbol:
+        errors.append("symbol index differs from the open orders")
+    if open_orders:
+        errors.append("%d orders still open" % len(open_orders))
+    if any(oms.exposure.values()):
+        errors.append("open exposure left without open orders")
+    if oms.keep_closed is not None:
+        closed = len(oms.orders) - len(open_orders)
+        if closed != len(oms.closed) or closed > oms.keep_closed:
+            errors.append("%d closed orders kept, %d tracked, limit %d"
+                          % (closed, len(oms.closed), oms.keep_closed))
+    return errors
+
+def main(argv: list=None) -> int:
+    """
+    Runs the benchmark and prints the results.
+    """
+    parser = argparse.ArgumentParser(prog="python -m trade.omsbench",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--in-flight", type=int, default=64,
+                        help="orders submitted before the broker runs")
+    parser.add_argument("--max-fill", type=int, default=100)
+    parser.add_argument("--cancel", type=float, default=0.05,
+                        help="fraction of the orders cancelled after their "
+                        "first fill (if still open)")
+    parser.add_argument("--max-position", type=int, default=10000,
+                        help="position limit of the risk check, 0 for none")
+    parser.add_argument("--allow-duplicates", action="store_true")
+    parser.add_argument("--keep-closed", type=int,
+                        help="closed orders kept in the book, default all")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Rejections are counted below instead of logged one by one.
+    logger.set_level("trade.oms", logging.ERROR)
+    rng = random.Random(args.seed)
+    symbols = ["S%03d" % i for i in range(args.symbols)]
+    orders, fills = queue.Queue(), queue.Queue()
+    oms = OrderManager(orders, args.max_position or None,
+                       args.allow_duplicates, args.keep_closed)
+    broker = PartialFillExecutionHandler(fills, max_fill=args.max_fill,
+                                         seed=args.seed)
+    filled = {}
+    n_fills = 0
+
+    start = time.perf_counter()
+    submitted = 0
+    while submitted < args.orders:
+        batch = min(args.in_flight, args.orders - submitted)
+        for _ in range(batch):
+            oms.submit(OrderEvent(rng.choice(symbols), "MKT",
+                                  rng.randint(1, 1000),
+                                  rng.choice(("BUY", "SELL"))))
+        submitted += batch
+        while not orders.empty():
+            event = orders.get()
+            broker.execute_order(event)
+            # The remaining fills are on their way already and arrive late.
+            cancel = rng.random() < args.cancel
+            while not fills.empty():
+                fill = fills.get()
+                oms.update_fill(fill)
+                sign = 1 if fill.direction == "BUY" else -1
+                filled[fill.symbol] = filled.get(fill.symbol, 0) + \
+                    sign * fill.quantity
+                n_fills += 1
+                if cancel:
+                    oms.cancel(fill.order_id)
+                    cancel = False
+    elapsed = time.perf_counter() - start
+
+    errors = check(oms, filled)
+    counts = ", ".join("%s %d" % (status, len(oms.by_status[status]))
+                       for status in STATUSES if status not in OPEN_STATUSES)
+    print("orders: %d, fills: %d (%s kept)" % (submitted, n_fills, counts))
+    print("throughput: %.0f orders/s, %.0f fills/s" % (
+        submitted / elapsed, n_fills / elapsed))
+    for error in errors:
+        print("error: %s" % error)
+    print("consistent" if not errors else "INCONSISTENT")
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
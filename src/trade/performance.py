@@ -4,7 +4,7 @@ to assess the goodity of the strategy post-backtest. Sharpe, MDDD, etc.
 
 The file does not contain full logic that will be used live.
 """
-from typing import Tuple
+from typing import List, Tuple
 import pandas as pd
 import numpy as np
 
@@ -41,13 +41,39 @@ def get_drawdown(equity_curve: pd.Series) -> Tuple[float, float]:
     """
     hwm = [0]  # TODO: understand the concept of high water mark.
     equity_idx = equity_curve.index
-    drawdown = pd.Series(index=equity_idx)
-    duration = pd.Series(index=equity_idx)
+    drawdown = pd.Series(0.0, index=equity_idx)
+    duration = pd.Series(0.0, index=equity_idx)
     
     len_idx = len(equity_idx)
     for t in range(1, len_idx):
-        hwm.append(max(hwm[t-1], equity_curve[t]))
-        drawdown[t] = hwm[t] - equity_curve[t]
-        duration[t] = 0 if drawdown[t] == 0 else duration[t-1] + 1
+        hwm.append(max(hwm[t-1], equity_curve.iloc[t]))
+        drawdown.iloc[t] = hwm[t] - equity_curve.iloc[t]
+        duration.iloc[t] = 0 if drawdown.iloc[t] == 0 \
+            else duration.iloc[t-1] + 1
 
     return drawdown.max(), duration.max()
+
+def get_summary_stats(equity_curve: pd.DataFrame) -> List[Tuple[str, str]]:
+    """
+    Creates a list of summary statistics for an equity curve DataFrame
+    with "returns" and "equity_curve" columns, as produced by
+    NaivePortfolio.get_equity_curve_df().
+
+    Args:
+        equity_curve: DataFrame indexed on datetime.
+
+    Returns:
+        List of (name, formatted value) tuples.
+    """
+    total_return = equity_curve["equity_curve"].iloc[-1]
+    returns = equity_curve["returns"]
+    pnl = equity_curve["equity_curve"]
+
+    sharpe_ratio = get_sharpe_ratio(returns)
+    mdd, ddd = get_drawdown(pnl)
+
+    stats = [("Total Return", "%0.2f%%" % ((total_return - 1) * 100)),
+             ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
+             ("MDD", "%0.2f%%" % (mdd * 100)),
+             ("DD", "%d" % ddd)]
+    return stats
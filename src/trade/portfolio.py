@@ -9,12 +9,13 @@ from typing import List, Dict, Union, Tuple
 from abc import ABC, abstractmethod
 from math import floor
 import pandas as pd
-import numpy as np
 import datetime
 import queue
 
-from events import *  # from src.trade.events
-from data import DataHandler  # from src.trade.data
+from .events import *
+from .data import DataHandler
+from .oms import OrderManager
+from .performance import get_summary_stats
 
 class Portfolio(ABC):
     """
@@ -35,7 +36,7 @@ class Portfolio(ABC):
         Acts on FillEvent and updates the portfolio object with
         current positions and holding from the event.
         """
-        raise NotImplementnedError("Must implement update_fill()")
+        raise NotImplementedError("Must implement update_fill()")
 
 class NaivePortfolio(Portfolio):
     """
@@ -71,6 +72,9 @@ class NaivePortfolio(Portfolio):
         # TODO: Define holdings.
         self.all_holdings = self.get_all_holdings()
         self.current_holdings = self.get_current_holdings()
+        # Orders go to the broker through the OMS, see trade.oms. Only the
+        # latest closed orders are kept, the book is in every checkpoint.
+        self.oms = OrderManager(events, keep_closed=1000)
 
     # TODO: make sure that it returns an int.
     def get_all_positions(self) -> List[Dict[str, Union[int, datetime.date]]]:
@@ -124,7 +128,7 @@ class NaivePortfolio(Portfolio):
         market data bar. This reflects the previous bar, thus all
         current market data is known (OLHCVI what is this?).
         """
-        bars = {s:self.bar.get_latest_bars(s, n_bars=1)
+        bars = {s:self.bars.get_latest_bars(s, n_bars=1)
                 for s in self.symbol_list}
 
         # Update positions.
@@ -198,6 +202,7 @@ class NaivePortfolio(Portfolio):
             event: Event.
         """
         if event.type == "FILL":
+            self.oms.update_fill(event)
             self.update_positions_fill(event)
             self.update_holdings_fill(event)
 
@@ -217,7 +222,9 @@ class NaivePortfolio(Portfolio):
         strength = signal.strength
 
         mkt_quantity = floor(100 * strength)
-        cur_quantity = self.current_positions[symbol]
+        # Orders still being filled count as if they were filled already.
+        cur_quantity = self.current_positions[symbol] + \
+            self.oms.get_open_exposure(symbol)
         order_type = "MKT"
 
         if direction == "LONG" and cur_quantity == 0:
@@ -238,7 +245,40 @@ class NaivePortfolio(Portfolio):
         """
         if event.type == "SIGNAL":
             order_event = self.get_naive_order(event)
-            self.events.put(order_event)
+            if order_event is not None:
+                self.oms.submit(order_event)
+
+    def get_state(self, since: int=0) -> dict:
+        """
+        Returns the ledgers of the portfolio for checkpointing. Rows of
+        all_positions/all_holdings are never modified once appended, so a
+        checkpoint only needs the rows added since the previous one.
+
+        Args:
+            since: number of ledger rows already saved, left out.
+        """
+        return {"ledger_start": since,
+                "all_positions": self.all_positions[since:],
+                "current_positions": self.current_positions,
+                "all_holdings": self.all_holdings[since:],
+                "current_holdings": self.current_holdings,
+                "oms": self.oms.get_state()}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restores the ledgers returned by get_state(). A state with
+        ledger_start > 0 extends the ledgers kept up to that row.
+        """
+        state = dict(state)
+        if "oms" in state:
+            self.oms.set_state(state.pop("oms"))
+        start = state.pop("ledger_start", 0)
+        if start:
+            state["all_positions"] = self.all_positions[:start] + \
+                state["all_positions"]
+            state["all_holdings"] = self.all_holdings[:start] + \
+                state["all_holdings"]
+        vars(self).update(state)
 
     def get_equity_curve_df(self):
         """
@@ -258,15 +298,4 @@ class NaivePortfolio(Portfolio):
         Creates a list of summary statistics for the portfolio such
         as Sharpe Ratio, drawdown information, and so on (more later).
         """
-        total_return = self.equity_curve["equity_curve"][-1]
-        returns = self.equity_curve["returns"]
-        pnl = self.equity_curve["equity_curve"]
-
-        sharpe_ratio = get_sharpe_ratio(returns)
-        mdd, ddd = get_drawdowns(pnl)
-
-        stats = [("Total Return", "%0.2f%%" % ((total_return - 1) * 100)),
-                 ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
-                 ("MDD", "%0.2f%%" % (mdd * 100)),
-                 ("DD", "%d" % ddd)]
-        return stats
+        return get_summary_stats(self.equity_curve)
@@ -10,12 +10,12 @@ Todo:
 """
 from typing import List, Dict
 from abc import ABC, abstractmethod
-import numpy as np
-import pandas as pd
 import queue
 
-from events import SignalEvent, MarketEvent  # src.trade.event
-from data import DataHandler  # src.trade.data
+import numpy as np
+
+from .events import SignalEvent, MarketEvent
+from .data import DataHandler
 
 class Strategy(ABC):
     """
@@ -34,6 +34,26 @@ class Strategy(ABC):
         """
         raise NotImplementedError("Must implement calculate_signals()")
 
+    def reset_positions(self) -> None:
+        """
+        Forgets which positions the strategy believes it holds, while
+        keeping indicator state. Used when the strategy is handed a fresh
+        (flat) portfolio, e.g. between walk-forward windows.
+        """
+        pass
+
+    def get_state(self) -> dict:
+        """
+        Returns the strategy state for checkpointing: every attribute
+        except the data handler and the event queue.
+        """
+        return {k: v for k, v in vars(self).items()
+                if k not in ("bars", "events")}
+
+    def set_state(self, state: dict) -> None:
+        """Restores the state returned by get_state()."""
+        vars(self).update(state)
+
 class BuyAndHoldStrategy(Strategy):
     """
     Simple strategy that goes LONG for every symbols each update.
@@ -62,6 +82,12 @@ class BuyAndHoldStrategy(Strategy):
         bought = {s:False for s in self.symbol_list}
         return bought
 
+    def reset_positions(self) -> None:
+        """
+        Resets the bought flags, see Strategy.reset_positions().
+        """
+        self.bought = self.set_initial_bought()
+
     def calculate_signals(self, event: MarketEvent) -> None:
         """
         For the MarketEvent, updates the event queue and sets True.
@@ -77,10 +103,146 @@ class BuyAndHoldStrategy(Strategy):
         if event.type == "MARKET":
             for s in self.symbol_list:
                 # Get the last bar for the symbol?
-                bars = self.bars.get_latest_bars(s, N=1)
+                bars = self.bars.get_latest_bars(s, n_bars=1)
                 if bars is not None and bars != []:
                     if self.bought[s] == False:
                         # (Symbol, Datetime, Type = LONG)
                         signal = SignalEvent(bars[0][0], bars[0][1], 'LONG')
                         self.events.put(signal)
                         self.bought[s] = True
+
+class CrossSectionalStrategy(Strategy):
+    """
+    Base class for strategies that look at the whole universe at once, such
+    as ranking, momentum rotation or pairs. Every bar the inherited class
+    receives an aligned (symbols x window) matrix of close prices, oldest
+    column first, and returns a vector of target directions: 1 for LONG,
+    -1 for SHORT and 0 for flat.
+
+    The vector is compared against the previous one and SignalEvents are
+    only generated for the symbols whose direction changed. A change of
+    sign (LONG to SHORT or back) is sent as EXIT first, since NaivePortfolio
+    only opens a position when it is flat; the new direction follows on the
+    next bar.
+    """
+    def __init__(self, bars: DataHandler, events: queue, window: int=1) -> None:
+        """
+        Initializes the cross-sectional strategy object.
+
+        Args:
+            bars: datahandler that provides live/historical data.
+            events: queue object containing events in order.
+            window: number of bars in the price matrix.
+        """
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.events = events
+        self.window = window
+        self.n_bars = 0
+
+        # Every close is written twice, window columns apart, so that
+        # buffer[:, pos:pos + window] is always the ordered window without
+        # rolling or copying the matrix.
+        self.buffer = np.full((len(self.symbol_list), 2 * window), np.nan)
+        self.signals = np.zeros(len(self.symbol_list), dtype=np.int8)
+
+    @abstractmethod
+    def calculate_cross_section(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Calculates the target directions for the whole universe.
+
+        Args:
+            prices: (symbols x window) close prices in symbol_list order.
+
+        Returns:
+            Vector of len(symbol_list) with values in {-1, 0, 1}. Other
+            values are reduced to their sign, NaN counts as flat.
+        """
+        raise NotImplementedError("Must implement calculate_cross_section()")
+
+    def reset_positions(self) -> None:
+        """
+        Resets the last directions to flat, see Strategy.reset_positions().
+        """
+        self.signals = np.zeros(len(self.symbol_list), dtype=np.int8)
+
+    def get_price_matrix(self) -> np.ndarray:
+        """
+        Returns the (symbols x window) view of the latest closes.
+        """
+        pos = self.n_bars % self.window
+        return self.buffer[:, pos:pos + self.window]
+
+    def update_prices(self) -> object:
+        """
+        Pushes the latest close of every symbol into the price matrix.
+
+        Returns:
+            datetime of the latest bar, None if there is no data yet.
+        """
+        # One bar for the time, the closes of the universe in one call.
+        latest = self.bars.get_latest_bars(self.symbol_list[0], n_bars=1)
+        if not latest:
+            return None
+        closes = self.bars.get_latest_closes()
+        pos = self.n_bars % self.window
+        self.buffer[:, pos] = closes
+        self.buffer[:, pos + self.window] = closes
+        self.n_bars += 1
+        return latest[0][1]
+
+    def calculate_signals(self, event: MarketEvent) -> None:
+        """
+        For the MarketEvent, updates the price matrix, asks the inherited
+        class for the new directions, and sends SignalEvents for the symbols
+        whose direction changed.
+
+        Args:
+            event: MarketEvent object.
+        """
+        if event.type != "MARKET":
+            return
+        timeindex = self.update_prices()
+        if timeindex is None or self.n_bars < self.window:
+            return
+
+        target = np.sign(np.nan_to_num(np.asarray(
+            self.calculate_cross_section(self.get_price_matrix()),
+            dtype=float))).astype(np.int8)
+        # Sign flips go through flat first, see the class docstring.
+        target = np.where(target * self.signals < 0, 0, target)
+        changed = np.flatnonzero(target != self.signals)
+        names = {1: "LONG", -1: "SHORT", 0: "EXIT"}
+        for i in changed:
+            self.events.put(SignalEvent(self.symbol_list[i], timeindex,
+                                        names[int(target[i])]))
+        self.signals = target
+
+class MomentumRotationStrategy(CrossSectionalStrategy):
+    """
+    Ranks the universe by the return over the window and holds the top
+    symbols LONG, rotating out of the ones that fall from the top.
+    """
+    def __init__(self, bars: DataHandler, events: queue, window: int=20,
+                 top: int=1) -> None:
+        """
+        Initializes the momentum rotation strategy object.
+
+        Args:
+            bars: datahandler that provides live/historical data.
+            events: queue object containing events in order.
+            window: lookback in bars for the momentum.
+            top: number of symbols to hold.
+        """
+        super().__init__(bars, events, window)
+        self.top = top
+
+    def calculate_cross_section(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Goes LONG the top symbols by window return, flat on the rest.
+        """
+        momentum = prices[:, -1] / prices[:, 0] - 1.0
+        momentum = np.where(np.isnan(momentum), -np.inf, momentum)
+        target = np.zeros(len(momentum), dtype=np.int8)
+        target[np.argsort(-momentum, kind="stable")[:self.top]] = 1
+        return target
@@ -3,9 +3,9 @@ This file contains some methods that merely imitate and duplicate the
 exercises from the book about Quantitative Trading. Sharpe ratios, drawdowns,
 and other simple but important concepts to better understand the content.
 """
-import yfinance as yf
 import numpy as np
-from src.utilities import logger
+
+from utilities import logger
 
 log = logger.get_logger_config(__name__)
 
@@ -24,6 +24,9 @@ def long_term_sharpe(symbol: str, start: str, end: str) -> float:
     Returns:
         sharpe_ratio: float number indicating the Sharpe ratio.
     """
+    # Imported here, yfinance alone takes longer to import than the rest.
+    import yfinance as yf
+
     # Ticket object for the stock I am looking for.
     stock_object = yf.Ticker(symbol)
 
@@ -40,8 +43,8 @@ def long_term_sharpe(symbol: str, start: str, end: str) -> float:
     mean_ret = np.mean(excess_returns)
     std_ret = np.std(excess_returns)
     sharpe_ratio = np.sqrt(252) * mean_ret / std_ret
-    log.info("For {0} from {1} to {2} the Sharpe Ratio is {3}"
-             .format(symbol, start, end, sharpe_ratio))
+    log.info("For %s from %s to %s the Sharpe Ratio is %s",
+             symbol, start, end, sharpe_ratio)
     
     return sharpe_ratio
     # Calculating cumulative compounded returns
@@ -0,0 +1,241 @@
+"""
+Walk-forward optimization on top of the DataHandler/Strategy/NaivePortfolio
+stack. The history is split into rolling train/test windows: on every train
+window all of the candidate strategies run in one pass over the data, the
+best one (by Sharpe ratio) is then run out-of-sample on the following test
+window, and the out-of-sample segments are stitched into a single report.
+
+Strategies are warmed up once. Every candidate keeps a strategy that is
+moved forward from one train window start to the next (step bars), and each
+train run starts from a copy of it, so overlapping train windows share their
+indicator state instead of replaying the warm-up bars again. The winner of a
+train window ends exactly where its test window starts and trades it as is.
+
+All of the windows read the same bar store (see data.load_bar_store), which
+is loaded once and only sliced by index.
+"""
+from typing import Callable, Dict, List, Tuple
+import copy
+import queue
+
+import numpy as np
+import pandas as pd
+
+from .data import BarStoreDataHandler, get_close_matrix
+from .engine import run_many
+from .performance import get_sharpe_ratio, get_summary_stats
+from .strategy import Strategy
+
+class WalkForwardScheduler:
+    """
+    Schedules the train/test windows and runs them, carrying the indicator
+    state of every candidate from window to window (see the module
+    docstring) instead of rebuilding and warming it up for each of them.
+    """
+    def __init__(self, store: dict, symbol_list: list,
+                 candidates: Dict[str, Callable], train: int, test: int,
+                 step: int=None, warmup: int=0,
+                 initial_capital: float=100000.0) -> None:
+        """
+        Initializes the scheduler.
+
+        Args:
+            store: bar store from data.load_bar_store().
+            symbol_list: list of symbols to trade.
+            candidates: dict of name to Strategy subclass (or any callable)
+                        taking (bars, events).
+            train: number of bars in a train window.
+            test: number of bars in a test window.
+            step: bars between two windows, defaults to test. With a step
+                  shorter than test the test windows overlap, and every
+                  bar is reported from the earliest window covering it.
+            warmup: bars replayed through the candidates before the first
+                    train window, for indicators that keep incremental
+                    state. Later windows continue from the earlier ones.
+            initial_capital: starting cash of every portfolio.
+        """
+        self.store = store
+        self.symbol_list = symbol_list
+        self.candidates = candidates
+        self.train = train
+        self.test = test
+        self.step = test if step is None else step
+        self.warmup = warmup
+        self.initial_capital = initial_capital
+        # Shared by the data handlers of every window.
+        self.closes = get_close_matrix(store, symbol_list)
+
+    def get_windows(self) -> List[Tuple[int, int, int, int]]:
+        """
+        Splits the store into windows. The first train window starts after
+        the warm-up bars, the last test window may be shorter.
+
+        Returns:
+            List of (train_start, train_stop, test_start, test_stop) bar
+            indexes, stops excluded.
+        """
+        n_bars = len(self.store[self.symbol_list[0]])
+        windows = []
+        train_start = self.warmup
+        while train_start + self.train < n_bars:
+            test_start = train_start + self.train
+            test_stop = min(test_start + self.test, n_bars)
+            windows.append((train_start, test_start, test_start, test_stop))
+            train_start += self.step
+        return windows
+
+    def advance(self, strategy: Strategy, start: int, stop: int) -> None:
+        """
+        Replays the bars of [start, stop) through a strategy. Signals
+        generated on the way are discarded.
+
+        Args:
+            strategy: Strategy object whose state ends at bar start.
+            start: index of the first bar to replay.
+            stop: index after the last bar to replay.
+        """
+        events = queue.Queue()
+        bars = BarStoreDataHandler(events, self.store, self.symbol_list,
+                                   start, stop, self.closes)
+        strategy = _rebind(strategy)(bars, events)
+        while bars.continue_backtest:
+            bars.update_bars()
+            while True:
+                try:
+                    event = events.get(False)
+                except queue.Empty:
+                    break
+                if event.type == "MARKET":
+                    strategy.calculate_signals(event)
+
+    def get_strategy(self, name: str, start: int) -> Strategy:
+        """
+        Creates a candidate strategy and replays the warm-up bars before
+        start through it.
+
+        Args:
+            name: candidate name.
+            start: index of the first bar the strategy will trade.
+
+        Returns:
+            Strategy object with warm indicators and no positions.
+        """
+        events = queue.Queue()
+        first = max(0, start - self.warmup)
+        bars = BarStoreDataHandler(events, self.store, self.symbol_list,
+                                   first, start, self.closes)
+        strategy = self.candidates[name](bars, events)
+        self.advance(strategy, first, start)
+        strategy.reset_positions()
+        return strategy
+
+    def run_slice(self, strategies: Dict[str, Strategy], start: int,
+                  stop: int) -> Dict[str, object]:
+        """
+        Runs already constructed strategies over [start, stop) in one pass,
+        each with a fresh portfolio.
+
+        Args:
+            strategies: dict of name to Strategy object.
+            start: index of the first bar.
+            stop: index after the last bar.
+
+        Returns:
+            Dict of name to NaivePortfolio with the equity curve computed.
+        """
+        market_events = queue.Queue()
+        bars = BarStoreDataHandler(market_events, self.store,
+                                   self.symbol_list, start, stop,
+                                   self.closes)
+        start_date = self.store[self.symbol_list[0]][max(0, start - 1)][1]
+        return run_many(bars, market_events,
+                        {name: _rebind(strategy)
+                         for name, strategy in strategies.items()},
+                        start_date, self.initial_capital)
+
+    def run(self) -> dict:
+        """
+        Runs every window and stitches the out-of-sample segments.
+
+        Returns:
+            Dict with the stitched "equity_curve" DataFrame (returns,
+            equity_curve and the strategy used on every bar), its summary
+            "stats", and the list of "windows" with the chosen strategy,
+            its train Sharpe ratio and the test summary stats.
+        """
+        dates = [bar[1] for bar in self.store[self.symbol_list[0]]]
+        if not self.get_windows():
+            raise ValueError("no walk-forward window fits in %d bars with "
+                             "train=%d, test=%d and warmup=%d"
+                             % (len(dates), self.train, self.test,
+                                self.warmup))
+        warm = {}  # Strategy per candidate, at the last train start.
+        position = None
+        segments = []
+        windows = []
+
+        for train_start, train_stop, test_start, test_stop in \
+                self.get_windows():
+            # Move the warm strategies to this train window, then run a
+            # copy of each of them over it in one pass.
+            if not warm:
+                warm = {name: self.get_strategy(name, train_start)
+                        for name in self.candidates}
+            else:
+                for strategy in warm.values():
+                    self.advance(strategy, position, train_start)
+                    strategy.reset_positions()
+            position = train_start
+            trained = {name: _clone(strategy)
+                       for name, strategy in warm.items()}
+            ports = self.run_slice(trained, train_start, train_stop)
+            scores = {name: get_sharpe_ratio(port.equity_curve["returns"])
+                      for name, port in ports.items()}
+            best = max(scores, key=lambda name: -np.inf
+                       if np.isnan(scores[name]) else scores[name])
+
+            # Out-of-sample: the winner ends where the test window starts.
+            strategy = trained[best]
+            strategy.reset_positions()
+            port = self.run_slice({best: strategy}, test_start,
+                                  test_stop)[best]
+
+            # The first row is the initial capital before the window, and
+            # overlapping test windows only add the bars after the last one.
+            segment = port.equity_curve[["returns"]].iloc[1:]
+            if segments:
+                segment = segment[segment.index > segments[-1].index[-1]]
+            segment = segment.copy()
+            segment["strategy"] = best
+            segments.append(segment)
+            windows.append({"train": (dates[train_start],
+                                      dates[train_stop - 1]),
+                            "test": (dates[test_start], dates[test_stop - 1]),
+                            "strategy": best, "train_sharpe": scores[best],
+                            "stats": get_summary_stats(port.equity_curve)})
+
+        curve = pd.concat(segments)
+        curve["equity_curve"] = (1.0 + curve["returns"]).cumprod()
+        curve["total"] = self.initial_capital * curve["equity_curve"]
+        return {"equity_curve": curve, "stats": get_summary_stats(curve),
+                "windows": windows}
+
+def _clone(strategy: Strategy) -> Strategy:
+    """
+    Returns a copy of the strategy with its own state, sharing only the
+    data handler and event queue, which are rebound before every run.
+    """
+    clone = copy.copy(strategy)
+    clone.set_state(copy.deepcopy(strategy.get_state()))
+    return clone
+
+def _rebind(strategy: Strategy) -> Callable:
+    """
+    Returns a factory for run_many() that hands an existing strategy the
+    data handler and event queue of the new run instead of creating one.
+    """
+    def factory(bars: object, events: queue.Queue) -> Strategy:
+        strategy.bars = bars
+        strategy.events = events
+        return strategy
+    return factory
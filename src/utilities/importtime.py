@@ -0,0 +1,98 @@
+"""
+Startup benchmark for the command line entry points. Runs every entry point
+with `python -X importtime` and parses the report written to stderr. Fails
+(non-zero exit code) when the import time goes over the budget or when a
+heavy dependency is imported by a command that should not need it.
+
+Usage, from the src/ directory:
+    python -m utilities.importtime --budget-ms 100
+"""
+from typing import List, Set, Tuple
+import argparse
+import os
+import subprocess
+import sys
+
+# Entry points that must start without any heavy dependency.
+COMMANDS = [["-m", "trade", "--help"],
+            ["-m", "dataserver", "--help"]]
+HEAVY_MODULES = {"pandas", "numpy", "zmq", "yfinance"}
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(report: str) -> Tuple[int, Set[str]]:
+    """
+    Parses the -X importtime report.
+
+    Args:
+        report: stderr of the interpreter. Example line:
+                "import time:       254 |        732 |   encodings.aliases"
+
+    Returns:
+        total: cumulative import time of the top level imports in us.
+        modules: set of the names of all imported modules.
+    """
+    total = 0
+    modules = set()
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # Header line.
+        name = fields[2][1:]
+        modules.add(name.strip())
+        # Nested imports are indented, only count the top level once.
+        if not name.startswith(" "):
+            total += int(fields[1])
+    return total, modules
+
+def measure(command: List[str], runs: int=5) -> Tuple[int, Set[str]]:
+    """
+    Runs the command several times and returns the fastest import time,
+    which is the least noisy estimate on a busy machine.
+
+    Args:
+        command: interpreter arguments. Example: ["-m", "trade", "--help"].
+        runs: number of runs.
+
+    Returns:
+        Fastest total import time in us and the set of imported modules.
+    """
+    best = None
+    modules = set()
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime"] + command,
+                              cwd=SRC_DIR, capture_output=True, text=True,
+                              check=False)
+        total, modules = parse_importtime(proc.stderr)
+        best = total if best is None else min(best, total)
+    return best, modules
+
+def main(argv: list=None) -> int:
+    """
+    Measures every entry point and compares it with the budget.
+    Returns:
+        0 if every command is within budget, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(prog="python -m utilities.importtime")
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for command in COMMANDS:
+        total, modules = measure(command, args.runs)
+        heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+        status = "ok"
+        if total / 1000.0 > args.budget_ms or heavy:
+            status = "FAIL"
+            failed = True
+        print("%-30s %8.1f ms  %s" % (" ".join(command), total / 1000.0,
+                                      status))
+        if heavy:
+            print("    heavy imports: %s" % ", ".join(heavy[:10]))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,292 @@
 """
-This file defines logging interface with logging module.
+This file defines logging interface with logging module. Every logger hands
+its records to an in-memory queue, and a single background thread (the
+QueueListener) formats and writes them to the file and the terminal. This way
+disk and terminal I/O never stall the event loop of trade/ or dataserver/.
+
+Records keep their %-style arguments until the writer thread formats them,
+so log with log.info("value is %s", value) and never with eager "%" or
+.format(). Arguments should be immutable (or not mutated afterwards), since
+they are rendered a bit later on another thread.
+
+The log file is debug.log in the working directory unless the TRADE_LOG_FILE
+environment variable names another path (an empty value disables the file).
+It is only created once the first record is written.
 """
+from typing import Dict, Optional, Tuple
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+
+LOG_FORMAT = ("[%(levelname)s] %(filename)s in %(funcName)s() %(lineno)d: "
+              "%(message)s")
+
+# Attributes present on every LogRecord, anything else came through extra=.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord(
+    "", 0, "", 0, "", None, None)).keys()) | {"message", "asctime"}
+
+LOG_FILE = os.environ.get("TRADE_LOG_FILE", "debug.log") or None
+
+_lock = threading.RLock()
+_listener = None
+_handler = None
+# Arguments of the last configure() call, for the pipeline of forked children.
+_config = None
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Formats every record as one compact JSON object per line, so that the
+    log file can be loaded straight into pandas or grepped by field. Values
+    passed through extra= are added as top level keys.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Serializes the record into a single JSON line.
+
+        Args:
+            record: LogRecord to serialize.
+
+        Returns:
+            JSON string without the trailing newline.
+        """
+        payload = {"ts": record.created, "level": record.levelname,
+                   "name": record.name, "file": record.filename,
+                   "func": record.funcName, "line": record.lineno,
+                   "msg": record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, separators=(",", ":"), default=str)
+
+class PlainFormatter(logging.Formatter):
+    """
+    LOG_FORMAT formatter that also reports the records dropped by the
+    RateLimitFilter, which the JSONLinesFormatter shows as "suppressed".
+    """
+    def __init__(self) -> None:
+        super().__init__(LOG_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats the record, noting the suppressed count if any."""
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += " (%d similar records suppressed)" % suppressed
+        return text
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (file and line). High frequency messages,
+    such as per-bar logs, are let through at most `rate` times per second
+    with bursts of up to `burst` records. The rate can be set per component
+    (logger name); the most specific name wins. The rest are dropped before
+    they are queued or formatted; the number of dropped records is attached
+    to the next record that passes as record.suppressed.
+    """
+    def __init__(self, rate: Optional[float]=10.0, burst: int=10,
+                 rates: Optional[Dict[str, Optional[float]]]=None) -> None:
+        """
+        Initializes the filter.
+
+        Args:
+            rate: number of records per second refilled for each call site,
+                  None to not limit components missing from rates.
+            burst: maximum number of records let through at once.
+            rates: per component rates, None to not limit a component.
+                   Example: {"trade.strategy": 1.0, "dataserver": None}.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict(rates or {})
+        self.buckets: Dict[Tuple[str, int], list] = {}
+        self.lock = threading.Lock()
+
+    def get_rate(self, name: str) -> Optional[float]:
+        """
+        Returns the rate of the logger: its own, the one of the closest
+        parent in rates, or the default rate.
+        """
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Returns True if the record should be logged. Warnings and errors
+        are never dropped.
+        """
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.get_rate(record.name)
+        if rate is None:
+            return True
+        key = (record.pathname, record.lineno)
+        now = record.created
+        # Filters run on every logging thread (e.g. dataserver workers).
+        with self.lock:
+            # Bucket is [tokens, last refill time, suppressed count].
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record untouched. The stock prepare()
+    formats the message on the calling thread, which is exactly the work
+    we want to move to the listener.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
-def get_logger_config(name: str) -> logging.getLogger:
+def configure(level: int=logging.INFO, filename: Optional[str]=LOG_FILE,
+              stream: bool=True, json_lines: bool=False,
+              levels: Optional[Dict[str, int]]=None,
+              rate: Optional[float]=None, burst: int=10,
+              rates: Optional[Dict[str, Optional[float]]]=None) -> None:
     """
-    Sets up the configuration for logging module. Uses a debug.log file for
-    saving the stdout/stderr debugging/info/error output. Example message:
+    Sets up the logging pipeline once per process. Calling it again replaces
+    the previous pipeline (the old listener is flushed and stopped first).
+
+    Args:
+        level: root level for every component.
+        filename: log file to write to, None to disable the file. Relative
+                  paths are resolved against the current directory now.
+        stream: whether to also write to stdout.
+        json_lines: write the file as JSON lines instead of plain text.
+        levels: per component levels. Example: {"dataserver": logging.DEBUG}.
+        rate: records per second per call site, None to disable limiting.
+        burst: burst size for the rate limit.
+        rates: per component rates overriding rate, see RateLimitFilter.
+               Example: {"trade.strategy": 1.0}.
+    """
+    global _listener, _handler, _config
+    with _lock:
+        _stop_listener()
+        _config = {"filename": filename, "stream": stream,
+                   "json_lines": json_lines, "rate": rate, "burst": burst,
+                   "rates": rates}
+        if filename is not None:
+            _config["filename"] = filename = os.path.abspath(filename)
+
+        handlers = []
+        if filename is not None:
+            file_handler = logging.FileHandler(filename, delay=True)
+            file_handler.setFormatter(JSONLinesFormatter() if json_lines
+                                      else PlainFormatter())
+            handlers.append(file_handler)
+        if stream:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(PlainFormatter())
+            handlers.append(stream_handler)
+
+        log_queue = queue.SimpleQueue()
+        _handler = _LazyQueueHandler(log_queue)
+        if rate is not None or any(r is not None
+                                   for r in (rates or {}).values()):
+            _handler.addFilter(RateLimitFilter(rate, burst, rates))
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True)
+
+        root = logging.getLogger()
+        root.handlers = [h for h in root.handlers
+                         if not isinstance(h, _LazyQueueHandler)]
+        root.addHandler(_handler)
+        root.setLevel(level)
+        for name, component_level in (levels or {}).items():
+            logging.getLogger(name).setLevel(component_level)
+
+        _listener.start()
+
+def set_level(name: str, level: int) -> None:
+    """
+    Changes the level of a single component at runtime.
+
+    Args:
+        name: logger name, usually the package or module. Example: trade.data.
+        level: new logging level.
+    """
+    logging.getLogger(name).setLevel(level)
+
+def shutdown() -> None:
+    """
+    Flushes the queue and stops the writer thread. Registered with atexit
+    (and with multiprocessing in forked children, which skip atexit), so it
+    only needs to be called by hand to flush the log at a given point.
+    """
+    with _lock:
+        _stop_listener()
+
+def _stop_listener() -> None:
+    """Stops the current listener, if any. Caller must hold _lock."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_handler)
+        _listener = None
+        _handler = None
+
+def get_logger_config(name: str) -> logging.Logger:
+    """
+    Returns the logger for the given component. The pipeline is configured
+    with defaults on the first call only, so importing many modules does not
+    reconfigure anything. Example message:
     Args:
         name: string signifying the name of the file for the logger.
     Returns:
-        logging.getLogger object that will be used for logging.
+        logging.Logger object that will be used for logging.
     Example:
         "[INFO] app.py in run() 22: The value returned is 2."
     """
-    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] "
-        "%(filename)s in %(funcName)s() %(lineno)d: %(message)s",
-        handlers=[logging.FileHandler("debug.log"),
-            logging.StreamHandler(sys.stdout)])
-    log = logging.getLogger(name)
-    return log
+    if _listener is None:
+        # Checked again under the (reentrant) lock configure() takes, so
+        # that two threads cannot both configure the pipeline.
+        with _lock:
+            if _listener is None:
+                configure()
+    return logging.getLogger(name)
+
+def _after_fork_in_child() -> None:
+    """
+    Rebuilds the pipeline in a forked child (e.g. a ProcessPoolExecutor
+    worker). The listener thread of the parent does not exist there, so
+    the inherited handler would queue records that nobody reads.
+    """
+    global _lock, _listener, _handler
+    # The parent may have held the lock while forking.
+    _lock = threading.RLock()
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    _listener = None
+    _handler = None
+    configure(logging.getLogger().level, **_config)
+    if "multiprocessing" in sys.modules:
+        # Pool workers leave with os._exit(), after running these.
+        import multiprocessing.util
+
+        multiprocessing.util.Finalize(None, shutdown, exitpriority=0)
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_after_fork_in_child)
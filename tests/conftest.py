@@ -0,0 +1,26 @@
+"""
+The packages live in src/ and are run from there (python -m trade), so the
+tests put src/ on the path the same way. Also holds the helpers shared by
+the test modules, imported with from conftest import ...
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "src"))
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+def write_csvs(csv_dir, n_bars: int=500) -> None:
+    """Writes random walk SYMBOL.csv files."""
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", periods=n_bars, freq="D",
+                          name="datetime")
+    for s in SYMBOLS:
+        close = 100.0 * np.cumprod(1.0 + rng.normal(0, 0.02, n_bars))
+        pd.DataFrame({"open": close, "low": close, "high": close,
+                      "close": close, "volume": 1000.0, "oi": 0},
+                     index=index).to_csv(csv_dir / ("%s.csv" % s))
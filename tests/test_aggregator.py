@@ -0,0 +1,88 @@
+"""
+Tests for dataserver.aggregator and the live bar feed of dataserver.driver.
+"""
+import datetime
+
+import pytest
+
+from dataserver.aggregator import BarAggregator, get_period_start
+from dataserver.driver import BarStore, Feed
+
+def minute(hour: int, minute: int) -> datetime.datetime:
+    return datetime.datetime(2021, 3, 10, hour, minute)
+
+def get_aggregator(timeframes: list):
+    emitted = []
+    aggregator = BarAggregator(timeframes, [lambda tf, bar:
+                                            emitted.append((tf, bar))])
+    return aggregator, emitted
+
+def test_period_start_boundaries():
+    assert get_period_start(minute(9, 35), 300) == minute(9, 35)
+    assert get_period_start(minute(9, 39), 300) == minute(9, 35)
+    assert get_period_start(minute(9, 59), 3600) == minute(9, 0)
+    assert get_period_start(datetime.datetime(2021, 3, 10, 23, 59, 59),
+                            86400) == minute(0, 0)
+    with pytest.raises(ValueError):
+        get_period_start(minute(9, 35).replace(
+            tzinfo=datetime.timezone.utc), 300)
+
+def test_bar_is_emitted_when_next_period_starts():
+    aggregator, emitted = get_aggregator(["5m"])
+    for m in range(30, 35):
+        aggregator.update(("SPY", minute(9, m), 1.0, 1.0, 1.0, 1.0, 1.0))
+    assert emitted == []
+    aggregator.update(("SPY", minute(9, 35), 2.0, 2.0, 2.0, 2.0, 1.0))
+    assert emitted == [("5m", ("SPY", minute(9, 30), 1.0, 1.0, 1.0, 1.0,
+                               5.0))]
+
+def test_flush_emits_open_bars():
+    aggregator, emitted = get_aggregator(["5m", "1h"])
+    aggregator.update(("SPY", minute(9, 31), 1.0, 0.5, 1.5, 1.2, 10.0))
+    aggregator.update(("QQQ", minute(9, 31), 2.0, 1.5, 2.5, 2.2, 20.0))
+    aggregator.flush()
+    assert sorted(emitted) == [
+        ("1h", ("QQQ", minute(9, 0), 2.0, 1.5, 2.5, 2.2, 20.0)),
+        ("1h", ("SPY", minute(9, 0), 1.0, 0.5, 1.5, 1.2, 10.0)),
+        ("5m", ("QQQ", minute(9, 30), 2.0, 1.5, 2.5, 2.2, 20.0)),
+        ("5m", ("SPY", minute(9, 30), 1.0, 0.5, 1.5, 1.2, 10.0))]
+    emitted.clear()
+    aggregator.flush()
+    assert emitted == []
+
+def test_multi_timeframe_ohlcv_folding():
+    aggregator, emitted = get_aggregator(["5m", "15m"])
+    # (open, low, high, close, volume) of every minute from 9:30 to 9:44.
+    bars = [(10.0 + m, 9.0 + m, 12.0 + m, 11.0 + m, float(m))
+            for m in range(15)]
+    bars[7] = (17.0, 1.0, 40.0, 17.5, 7.0)
+    for m, values in enumerate(bars):
+        aggregator.update(("SPY", minute(9, 30 + m)) + values)
+    aggregator.flush()
+    five = [bar for tf, bar in emitted if tf == "5m"]
+    fifteen = [bar for tf, bar in emitted if tf == "15m"]
+    assert five == [
+        ("SPY", minute(9, 30), 10.0, 9.0, 16.0, 15.0, 10.0),
+        ("SPY", minute(9, 35), 15.0, 1.0, 40.0, 20.0, 35.0),
+        ("SPY", minute(9, 40), 20.0, 19.0, 26.0, 25.0, 60.0)]
+    assert fifteen == [("SPY", minute(9, 30), 10.0, 1.0, 40.0, 25.0, 105.0)]
+
+def test_feed_push(tmp_path):
+    store = BarStore(str(tmp_path))
+    feed = Feed(store, ["5m"])
+    for m in range(30, 36):
+        feed.push(("SPY", minute(9, m), 1.0, 1.0, 1.0, float(m), 1.0))
+    with pytest.raises(ValueError):
+        feed.push(("SPY", minute(9, 36).replace(
+            tzinfo=datetime.timezone.utc), 1.0, 1.0, 1.0, 1.0, 1.0))
+
+    # Loaded after the pushes, from the files the feed wrote.
+    assert [bar[1] for bar in store.get("SPY")] == \
+        [minute(9, m) for m in range(30, 36)]
+    assert store.get("SPY", "5m") == [("SPY", minute(9, 30), 1.0, 1.0, 1.0,
+                                       34.0, 5.0)]
+    # Loaded before the next pushes: they are appended in memory.
+    feed.push(("SPY", minute(9, 40), 1.0, 1.0, 1.0, 40.0, 1.0))
+    assert [bar[5] for bar in store.get("SPY")][-1] == 40.0
+    assert [bar[1] for bar in store.get("SPY", "5m")] == \
+        [minute(9, 30), minute(9, 35)]
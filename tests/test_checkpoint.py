@@ -0,0 +1,66 @@
+"""
+Tests for trade.checkpoint: a run resumed after a crash must produce the
+same equity curve as an uninterrupted one.
+"""
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import SYMBOLS, write_csvs
+from trade import checkpoint, engine
+from trade.data import HistoricCSVDataHandler
+from trade.strategy import MomentumRotationStrategy
+
+class Crash(Exception):
+    """Raised in place of the process dying."""
+
+def run(csv_dir, path=None, **kwargs):
+    return engine.backtest(str(csv_dir), SYMBOLS,
+                           strategy_cls=MomentumRotationStrategy,
+                           checkpoint=path, checkpoint_every=100, **kwargs)
+
+def test_resume_after_crash_is_identical(tmp_path, monkeypatch):
+    write_csvs(tmp_path)
+    expected = run(tmp_path).equity_curve
+    path = str(tmp_path / "run.ckpt")
+
+    update_bars = HistoricCSVDataHandler.update_bars
+    def crashing_update_bars(self):
+        if self.bar_index == 333:
+            raise Crash()
+        update_bars(self)
+    monkeypatch.setattr(HistoricCSVDataHandler, "update_bars",
+                        crashing_update_bars)
+    with pytest.raises(Crash):
+        run(tmp_path, path)
+    monkeypatch.undo()
+
+    # The writer thread outlives the crashed loop, wait for bar 300.
+    deadline = time.monotonic() + 10
+    while (checkpoint.load(path) or {}).get("bars", {}).get(
+            "bar_index") != 300 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    state = checkpoint.load(path)
+    assert state["bars"]["bar_index"] == 300
+    assert len(state["portfolio"]["all_holdings"]) == 301
+
+    resumed = run(tmp_path, path).equity_curve
+    pd.testing.assert_frame_equal(resumed, expected)
+
+def test_truncated_frame_is_ignored(tmp_path):
+    write_csvs(tmp_path, 250)
+    path = str(tmp_path / "run.ckpt")
+    run(tmp_path, path)
+    with open(path, "ab") as snapshot:
+        snapshot.write(b"\x10\x00\x00\x00partial")
+    assert checkpoint.load(path)["bars"]["bar_index"] == 200
+
+def test_resume_with_other_parameters_fails(tmp_path):
+    write_csvs(tmp_path, 250)
+    path = str(tmp_path / "run.ckpt")
+    run(tmp_path, path)
+    with pytest.raises(ValueError):
+        run(tmp_path, path, initial_capital=50000.0)
+    with pytest.raises(ValueError):
+        engine.backtest(str(tmp_path), SYMBOLS[:2], checkpoint=path)
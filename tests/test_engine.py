@@ -0,0 +1,20 @@
+"""
+Tests for trade.engine: a single pass over many strategies must give the
+same results as one backtest per strategy.
+"""
+import pandas as pd
+
+from conftest import SYMBOLS, write_csvs
+from trade import engine
+from trade.strategy import BuyAndHoldStrategy, MomentumRotationStrategy
+
+def test_backtest_many_matches_backtest(tmp_path):
+    write_csvs(tmp_path, 250)
+    strategies = {"bh": BuyAndHoldStrategy, "mom": MomentumRotationStrategy}
+    ports = engine.backtest_many(str(tmp_path), SYMBOLS, strategies)
+    assert list(ports) == list(strategies)
+    for name, strategy_cls in strategies.items():
+        expected = engine.backtest(str(tmp_path), SYMBOLS,
+                                   strategy_cls=strategy_cls)
+        pd.testing.assert_frame_equal(ports[name].equity_curve,
+                                      expected.equity_curve)
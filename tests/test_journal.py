@@ -0,0 +1,35 @@
+"""
+Tests for trade.journal: recorded runs replay to the same events.
+"""
+import pytest
+
+from conftest import SYMBOLS, write_csvs
+from trade import engine, journal
+from trade.strategy import BuyAndHoldStrategy, MomentumRotationStrategy
+
+def test_replay_uses_recorded_strategy(tmp_path):
+    write_csvs(tmp_path, 200)
+    path = str(tmp_path / "run.journal")
+    engine.backtest(str(tmp_path), SYMBOLS, journal=path,
+                    strategy_cls=MomentumRotationStrategy)
+
+    result = journal.replay(path)
+    assert result["events_match"] and result["fills_match"]
+    assert result["holdings_match"]
+
+    result = journal.replay(path, BuyAndHoldStrategy)
+    assert not result["events_match"]
+
+def test_load_class():
+    assert journal.load_class(journal.get_class_name(
+        MomentumRotationStrategy)) is MomentumRotationStrategy
+
+def test_journal_of_resumed_run_is_refused(tmp_path):
+    write_csvs(tmp_path, 200)
+    checkpoint = str(tmp_path / "run.ckpt")
+    engine.backtest(str(tmp_path), SYMBOLS, checkpoint=checkpoint,
+                    checkpoint_every=100)
+    with pytest.raises(ValueError):
+        engine.backtest(str(tmp_path), SYMBOLS, checkpoint=checkpoint,
+                        checkpoint_every=100,
+                        journal=str(tmp_path / "run.journal"))
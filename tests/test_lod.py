@@ -0,0 +1,65 @@
+"""
+Tests for dataserver.lod.
+"""
+import numpy as np
+import pytest
+
+from dataserver.lod import LODStore, MinMaxPyramid
+
+def get_pyramid(n_points: int=10000, factor: int=4) -> MinMaxPyramid:
+    rng = np.random.default_rng(0)
+    pyramid = MinMaxPyramid(factor, 6)
+    for i, value in enumerate(np.cumsum(rng.normal(size=n_points))):
+        pyramid.append(float(i), float(value))
+    return pyramid
+
+@pytest.mark.parametrize("start, stop, width", [
+    (None, None, 100), (1000.0, 5000.0, 100), (1.0, 9998.0, 37),
+    (123.0, 4567.0, 10), (4000.0, 4003.0, 1), (10.0, 2000.0, 3000)])
+def test_query_is_bounded_clipped_and_keeps_extremes(start, stop, width):
+    pyramid = get_pyramid()
+    points = pyramid.query(start, stop, width)
+    first = 0 if start is None else int(start)
+    last = 9999 if stop is None else int(stop)
+
+    assert len(points) <= 2 * width + 2
+    times = [time for time, _ in points]
+    assert times == sorted(times)
+    assert times[0] >= first and times[-1] <= last
+    values = pyramid.values[first:last + 1]
+    assert min(value for _, value in points) == min(values)
+    assert max(value for _, value in points) == max(values)
+    for time, value in points:
+        assert pyramid.values[int(time)] == value
+
+def test_extremes_match_brute_force():
+    pyramid = get_pyramid(3000, factor=3)
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        lo, hi = sorted(rng.choice(3001, 2, replace=False))
+        values = pyramid.values[lo:hi]
+        low_t, low_v, high_t, high_v = pyramid.get_extremes(lo, hi)
+        assert (low_v, high_v) == (min(values), max(values))
+        assert low_t == lo + values.index(low_v)
+        assert high_t == lo + values.index(high_v)
+
+def test_out_of_order_append_raises():
+    pyramid = MinMaxPyramid()
+    pyramid.append(1.0, 1.0)
+    with pytest.raises(ValueError):
+        pyramid.append(0.0, 1.0)
+
+def test_out_of_order_batch_leaves_series_unchanged():
+    store = LODStore()
+    store.extend("curve", [(1.0, 1.0), (2.0, 2.0)])
+    with pytest.raises(ValueError):
+        store.extend("curve", [(3.0, 3.0), (0.0, 0.0)])
+    with pytest.raises(ValueError):
+        store.extend("curve", [(1.5, 3.0)])
+    assert store.query("curve") == [(1.0, 1.0), (2.0, 2.0)]
+
+def test_replace():
+    store = LODStore()
+    store.extend("curve", [(1.0, 1.0), (2.0, 2.0)])
+    store.extend("curve", [(1.0, 5.0)], replace=True)
+    assert store.query("curve") == [(1.0, 5.0)]
@@ -0,0 +1,28 @@
+"""
+Tests for utilities.logger.
+"""
+import concurrent.futures
+import logging
+import multiprocessing
+
+from utilities import logger
+
+def log_from_child(message: str) -> int:
+    logging.getLogger("trade.test").warning("%s", message)
+    return 0
+
+def test_forked_children_log(tmp_path):
+    path = tmp_path / "test.log"
+    logger.configure(filename=str(path), stream=False)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                2, mp_context=multiprocessing.get_context("fork")) as pool:
+            assert list(pool.map(log_from_child, ["child 1", "child 2"])) \
+                == [0, 0]
+        logging.getLogger("trade.test").warning("parent")
+        logger.shutdown()
+        lines = path.read_text().splitlines()
+        assert sorted(line.rsplit(": ", 1)[1] for line in lines) == \
+            ["child 1", "child 2", "parent"]
+    finally:
+        logger.configure(filename=None)
@@ -0,0 +1,127 @@
+"""
+Tests for trade.oms.OrderManager.
+"""
+import logging
+import queue
+
+from trade.events import FillEvent, OrderEvent
+from trade.oms import OrderManager
+from trade.omsbench import main as omsbench
+
+def fill(order, quantity: int) -> FillEvent:
+    return FillEvent(None, order.symbol, "ARCA", quantity, order.direction,
+                     None, order_id=order.order_id)
+
+def test_partial_fills():
+    events = queue.Queue()
+    oms = OrderManager(events)
+    order = oms.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    assert events.get(False).order_id == order.order_id
+    assert oms.get_open_exposure("SPY") == 100
+
+    oms.update_fill(fill(order, 30))
+    assert order.status == "PARTIAL" and order.remaining == 70
+    assert oms.get_position("SPY") == 30
+    assert oms.get_open_exposure("SPY") == 70
+    assert oms.get_open_orders("SPY") == [order]
+
+    oms.update_fill(fill(order, 70))
+    assert order.status == "FILLED"
+    assert oms.get_position("SPY") == 100
+    assert oms.get_open_exposure("SPY") == 0
+    assert oms.get_open_orders() == [] and oms.get_orders("FILLED") == [order]
+
+def test_cancel_then_late_fill():
+    oms = OrderManager(queue.Queue())
+    order = oms.submit(OrderEvent("SPY", "MKT", 100, "SELL"))
+    oms.update_fill(fill(order, 40))
+    assert oms.cancel(order.order_id)
+    assert not oms.cancel(order.order_id)
+    assert order.status == "CANCELLED"
+    assert oms.get_open_exposure("SPY") == 0
+
+    # Already in flight when the cancel was sent: counts in the position,
+    # not in the exposure.
+    oms.update_fill(fill(order, 60))
+    assert order.status == "CANCELLED" and order.filled == 100
+    assert oms.get_position("SPY") == -100
+    assert oms.get_open_exposure("SPY") == 0
+    assert oms.get_open_orders() == []
+
+def test_overfill():
+    oms = OrderManager(queue.Queue())
+    order = oms.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    oms.update_fill(fill(order, 150))
+    assert order.status == "FILLED" and order.filled == 100
+    assert oms.get_position("SPY") == 150
+    assert oms.get_open_exposure("SPY") == 0
+
+def test_duplicate_rejection():
+    events = queue.Queue()
+    oms = OrderManager(events)
+    first = oms.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    duplicate = oms.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    other = oms.submit(OrderEvent("SPY", "MKT", 100, "SELL"))
+    assert duplicate.status == "REJECTED"
+    assert other.status == "NEW"
+    assert [events.get(False).order_id for _ in range(events.qsize())] == \
+        [first.order_id, other.order_id]
+    assert oms.get_open_exposure("SPY") == 0
+
+    # Allowed again once the first one is done.
+    oms.update_fill(fill(first, 100))
+    assert oms.submit(OrderEvent("SPY", "MKT", 100, "BUY")).status == "NEW"
+
+    allowing = OrderManager(queue.Queue(), allow_duplicates=True)
+    allowing.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    assert allowing.submit(OrderEvent("SPY", "MKT", 100, "BUY")).status \
+        == "NEW"
+
+def test_risk_rejection_counts_open_orders():
+    events = queue.Queue()
+    oms = OrderManager(events, max_position=150)
+    first = oms.submit(OrderEvent("SPY", "MKT", 100, "BUY"))
+    oms.update_fill(fill(first, 60))
+    # Position 60 + open 40 + 60 would be 160.
+    assert oms.submit(OrderEvent("SPY", "MKT", 60, "BUY")).status \
+        == "REJECTED"
+    assert oms.submit(OrderEvent("SPY", "MKT", 50, "BUY")).status == "NEW"
+    assert oms.submit(OrderEvent("SPY", "MKT", 250, "SELL")).status == "NEW"
+    assert oms.submit(OrderEvent("SPY", "MKT", 200, "SELL")).status \
+        == "REJECTED"
+    assert oms.submit(OrderEvent("QQQ", "MKT", 150, "SELL")).status == "NEW"
+    assert events.qsize() == 4
+
+def test_keep_closed_drops_oldest_closed_orders(caplog):
+    oms = OrderManager(queue.Queue(), keep_closed=2)
+    orders = [oms.submit(OrderEvent("SPY", "MKT", 100 + i, "BUY"))
+              for i in range(4)]
+    oms.update_fill(fill(orders[0], 50))
+    oms.cancel(orders[0].order_id)
+    for order in orders[1:3]:
+        oms.update_fill(fill(order, order.quantity))
+    assert list(oms.orders) == [2, 3, 4]
+    assert oms.get_orders("CANCELLED") == []
+    assert oms.get_orders("FILLED") == orders[1:3]
+    assert oms.get_open_orders("SPY") == [orders[3]]
+    assert oms.get_open_exposure("SPY") == 103
+
+    # The late fill of the dropped order still counts, without a warning.
+    oms.update_fill(fill(orders[0], 50))
+    assert oms.get_position("SPY") == 100 + 101 + 102
+    assert "unknown order" not in caplog.text
+    oms.update_fill(fill(orders[3], 103))
+    assert list(oms.orders) == [3, 4] and oms.get_open_orders() == []
+
+def test_benchmark_is_consistent(capsys):
+    assert omsbench(["--orders", "2000", "--symbols", "5",
+                     "--in-flight", "128", "--max-position", "2000",
+                     "--cancel", "0.2"]) == 0
+    logging.getLogger("trade.oms").setLevel(logging.NOTSET)
+    output = capsys.readouterr().out
+    assert "consistent" in output and "REJECTED 0" not in output
+
+    assert omsbench(["--orders", "2000", "--symbols", "5",
+                     "--keep-closed", "100"]) == 0
+    logging.getLogger("trade.oms").setLevel(logging.NOTSET)
+    assert "consistent" in capsys.readouterr().out
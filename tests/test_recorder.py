@@ -0,0 +1,58 @@
+"""
+Tests for dataserver.recorder: recorded files must load in trade.data.
+"""
+import datetime
+import queue
+
+import pandas as pd
+
+from dataserver.driver import BarStore, Feed
+from dataserver.recorder import to_bar_frame
+from trade.data import HistoricCSVDataHandler, load_bar_store
+
+def get_history_frame() -> pd.DataFrame:
+    """Returns a yfinance-shaped frame spanning the March 2021 DST change."""
+    index = pd.DatetimeIndex(["2021-03-12 09:30", "2021-03-12 09:31",
+                              "2021-03-15 09:30", "2021-03-15 09:31"],
+                             name="Datetime").tz_localize("America/New_York")
+    return pd.DataFrame({"Open": [1.0, 2.0, 3.0, 4.0],
+                         "High": [1.5, 2.5, 3.5, 4.5],
+                         "Low": [0.5, 1.5, 2.5, 3.5],
+                         "Close": [1.2, 2.2, 3.2, 4.2],
+                         "Volume": [10, 20, 30, 40]}, index=index)
+
+def test_recorded_csv_round_trips(tmp_path):
+    to_bar_frame(get_history_frame()).to_csv(tmp_path / "SPY.csv")
+
+    events = queue.Queue()
+    bars = HistoricCSVDataHandler(events, str(tmp_path), ["SPY"])
+    while bars.continue_backtest:
+        bars.update_bars()
+    latest = bars.get_latest_bars("SPY", n_bars=4)
+    assert [bar[1] for bar in latest] == [
+        datetime.datetime(2021, 3, 12, 9, 30),
+        datetime.datetime(2021, 3, 12, 9, 31),
+        datetime.datetime(2021, 3, 15, 9, 30),
+        datetime.datetime(2021, 3, 15, 9, 31)]
+    assert latest[0][2:] == (1.0, 0.5, 1.5, 1.2, 10)
+    assert events.qsize() == 4
+
+    store = load_bar_store(str(tmp_path), ["SPY"])
+    assert [bar[1:] for bar in store["SPY"]] == [bar[1:] for bar in latest]
+
+def test_pushed_bars_load_with_recorded_daily_bars(tmp_path):
+    frame = get_history_frame().iloc[[0, 2]]
+    frame.index = frame.index.normalize()
+    to_bar_frame(frame).to_csv(tmp_path / "SPY.csv")
+    Feed(BarStore(str(tmp_path)), []).push(
+        ("SPY", datetime.datetime(2021, 3, 16), 5.0, 4.5, 5.5, 5.2, 50.0))
+    days = [datetime.datetime(2021, 3, d) for d in (12, 15, 16)]
+
+    events = queue.Queue()
+    bars = HistoricCSVDataHandler(events, str(tmp_path), ["SPY"])
+    while bars.continue_backtest:
+        bars.update_bars()
+    assert [bar[1] for bar in bars.get_latest_bars("SPY", n_bars=3)] == days
+    assert [bar[1] for bar in load_bar_store(str(tmp_path),
+                                             ["SPY"])["SPY"]] == days
+    assert [bar[1] for bar in BarStore(str(tmp_path)).get("SPY")] == days
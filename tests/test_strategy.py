@@ -0,0 +1,93 @@
+"""
+Tests for trade.strategy.CrossSectionalStrategy.
+"""
+import datetime
+import queue
+
+import numpy as np
+
+from trade.data import BarStoreDataHandler, ReplayDataHandler
+from trade.strategy import CrossSectionalStrategy
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+def get_store(n_bars: int) -> dict:
+    """Returns a bar store where the close of bar i of symbol k is 100k + i."""
+    start = datetime.datetime(2021, 1, 1)
+    return {s: [(s, start + datetime.timedelta(days=i), 0.0, 0.0, 0.0,
+                 100.0 * k + i, 0.0) for i in range(n_bars)]
+            for k, s in enumerate(SYMBOLS)}
+
+class ScriptedStrategy(CrossSectionalStrategy):
+    """Returns the next target of a script and keeps the price matrices."""
+    def __init__(self, bars, events, window, script):
+        super().__init__(bars, events, window)
+        self.script = list(script)
+        self.matrices = []
+
+    def calculate_cross_section(self, prices):
+        self.matrices.append(prices.copy())
+        return self.script.pop(0)
+
+def run(strategy: ScriptedStrategy, bars: BarStoreDataHandler,
+        events: queue.Queue) -> list:
+    """Runs the bars and returns the signals of every bar."""
+    signals = []
+    while bars.continue_backtest:
+        bars.update_bars()
+        strategy.calculate_signals(events.get(False))
+        bar_signals = []
+        while not events.empty():
+            event = events.get(False)
+            bar_signals.append((event.symbol, event.signal_type))
+        signals.append(bar_signals)
+    return signals
+
+def test_price_matrix_is_ordered_window():
+    events = queue.Queue()
+    bars = BarStoreDataHandler(events, get_store(7), SYMBOLS)
+    strategy = ScriptedStrategy(bars, events, 3, [[0, 0, 0]] * 5)
+    run(strategy, bars, events)
+
+    # One matrix per bar from the third one on, oldest column first.
+    assert len(strategy.matrices) == 5
+    for end, matrix in enumerate(strategy.matrices, start=3):
+        expected = [[100.0 * k + i for i in range(end - 3, end)]
+                    for k in range(len(SYMBOLS))]
+        np.testing.assert_array_equal(matrix, expected)
+
+def test_sign_flip_goes_through_exit():
+    events = queue.Queue()
+    bars = BarStoreDataHandler(events, get_store(5), SYMBOLS)
+    strategy = ScriptedStrategy(bars, events, 1, [
+        [1, -1, 0], [-1, -1, 0], [-1, -1, 0], [0, 1, 0], [0, 1, 0]])
+    signals = run(strategy, bars, events)
+
+    assert signals == [
+        [("AAA", "LONG"), ("BBB", "SHORT")],
+        [("AAA", "EXIT")],
+        [("AAA", "SHORT")],
+        [("AAA", "EXIT"), ("BBB", "EXIT")],
+        [("BBB", "LONG")]]
+
+def test_targets_are_reduced_to_their_sign():
+    events = queue.Queue()
+    bars = BarStoreDataHandler(events, get_store(1), SYMBOLS)
+    strategy = ScriptedStrategy(bars, events, 1,
+                                [np.array([5.0, -0.5, np.nan])])
+    assert run(strategy, bars, events) == [[("AAA", "LONG"),
+                                            ("BBB", "SHORT")]]
+
+def test_latest_closes_match_latest_bars():
+    store = get_store(4)
+    bar_store = BarStoreDataHandler(queue.Queue(), store, SYMBOLS, 1, 3)
+    replay = ReplayDataHandler(queue.Queue(), SYMBOLS)
+    assert np.isnan(replay.get_latest_closes()).all()
+    while bar_store.continue_backtest:
+        bar_store.update_bars()
+        replay.update_bars({s: bar_store.get_latest_bars(s)
+                            for s in SYMBOLS})
+        np.testing.assert_array_equal(bar_store.get_latest_closes(),
+                                      replay.get_latest_closes())
+    np.testing.assert_array_equal(bar_store.get_latest_closes(),
+                                  [2.0, 102.0, 202.0])
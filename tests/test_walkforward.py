@@ -0,0 +1,59 @@
+"""
+Tests for trade.walkforward.WalkForwardScheduler.
+"""
+import datetime
+
+import numpy as np
+import pytest
+
+from trade.strategy import MomentumRotationStrategy
+from trade.walkforward import WalkForwardScheduler
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+def get_store(n_bars: int) -> dict:
+    """Returns a bar store of random walks."""
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2021, 1, 1)
+    store = {}
+    for s in SYMBOLS:
+        closes = 100.0 * np.cumprod(1.0 + rng.normal(0, 0.01, n_bars))
+        store[s] = [(s, start + datetime.timedelta(days=i), c, c, c, c, 0.0)
+                    for i, c in enumerate(closes)]
+    return store
+
+def get_scheduler(store: dict, **kwargs) -> WalkForwardScheduler:
+    kwargs = {"train": 30, "test": 10, "warmup": 10, **kwargs}
+    return WalkForwardScheduler(
+        store, SYMBOLS,
+        {"fast": lambda b, e: MomentumRotationStrategy(b, e, 3),
+         "slow": lambda b, e: MomentumRotationStrategy(b, e, 10)},
+        **kwargs)
+
+def test_carried_state_matches_fresh_warmup():
+    scheduler = get_scheduler(get_store(100))
+    carried = scheduler.get_strategy("slow", 10)
+    for start in (20, 30, 40):
+        scheduler.advance(carried, start - 10, start)
+        fresh = scheduler.get_strategy("slow", start)
+        np.testing.assert_array_equal(carried.get_price_matrix(),
+                                      fresh.get_price_matrix())
+
+def test_run_covers_every_test_bar():
+    store = get_store(100)
+    result = get_scheduler(store).run()
+    assert len(result["windows"]) == 6
+    assert len(result["equity_curve"]) == 100 - 10 - 30
+    assert list(result["equity_curve"].index) == \
+        [bar[1] for bar in store["AAA"][40:]]
+
+def test_overlapping_test_windows_count_every_bar_once():
+    store = get_store(100)
+    result = get_scheduler(store, warmup=0, step=5).run()
+    curve = result["equity_curve"]
+    assert curve.index.is_unique
+    assert list(curve.index) == [bar[1] for bar in store["AAA"][30:]]
+
+def test_no_window_fails_clearly():
+    with pytest.raises(ValueError, match="train=30, test=10 and warmup=10"):
+        get_scheduler(get_store(40)).run()